@@ -0,0 +1,52 @@
+"""add recipes fts
+
+Revision ID: c3f7d2a9e415
+Revises: a8e14f6c2b90
+Create Date: 2026-10-18 14:05:51.127736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7d2a9e415'
+down_revision = 'a8e14f6c2b90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("""
+        CREATE VIRTUAL TABLE recipes_fts USING fts5(
+            title, instructions, content='recipes', content_rowid='id', prefix='2 3'
+        )
+    """)
+    op.execute("""
+        CREATE TRIGGER recipes_fts_ai AFTER INSERT ON recipes BEGIN
+            INSERT INTO recipes_fts(rowid, title, instructions)
+            VALUES (new.id, new.title, new.instructions);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER recipes_fts_ad AFTER DELETE ON recipes BEGIN
+            INSERT INTO recipes_fts(recipes_fts, rowid, title, instructions)
+            VALUES ('delete', old.id, old.title, old.instructions);
+        END
+    """)
+    op.execute("""
+        CREATE TRIGGER recipes_fts_au AFTER UPDATE OF title, instructions ON recipes BEGIN
+            INSERT INTO recipes_fts(recipes_fts, rowid, title, instructions)
+            VALUES ('delete', old.id, old.title, old.instructions);
+            INSERT INTO recipes_fts(rowid, title, instructions)
+            VALUES (new.id, new.title, new.instructions);
+        END
+    """)
+    op.execute("INSERT INTO recipes_fts(recipes_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS recipes_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS recipes_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS recipes_fts_ai")
+    op.execute("DROP TABLE IF EXISTS recipes_fts")
@@ -1,34 +1,104 @@
+import os
+
 from flask import Flask, session
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
 from flask_restful import Api
+from werkzeug.middleware.proxy_fix import ProxyFix
 
-from config import Config
+from server.config import configs
+from server.database import engine_options, install_sqlite_pragmas
+from server.cache import ProfileCache
+from server.compression import Compression
+from server.groupcommit import GroupCommit
+from server.hashing import HashPool
+from server.instrumentation import Metrics
+from server.ratelimit import RateLimiter
+from server.replicas import Replicas, RoutingSession
+from server.sessions import init_sessions
 
-db = SQLAlchemy()
-migrate = Migrate()
-bcrypt = Bcrypt()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+compression = Compression()
+group_commit = GroupCommit()
+hash_pool = HashPool()
+metrics = Metrics()
+profile_cache = ProfileCache()
+rate_limiter = RateLimiter()
+replicas = Replicas()
 
-def create_app():
+def create_app(config_object=None):
+    if config_object is None:
+        config_object = configs[os.environ.get('APP_ENV', 'development')]
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_object)
+    if not app.config["SECRET_KEY"]:
+        raise RuntimeError("SECRET_KEY must be set.")
+    if app.config.get("PROXY_FIX_X_FOR"):
+        # Per-IP rate limits need the client's address, not the proxy's.
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(
+        app.config["SQLALCHEMY_DATABASE_URI"], app.config.get("SQLALCHEMY_ENGINE_OPTIONS")
+    )
 
     db.init_app(app)
-    migrate.init_app(app, db)
-    bcrypt.init_app(app)
+    with app.app_context():
+        install_sqlite_pragmas(db.engine, app.config.get("SQLITE_PRAGMAS"))
+    replicas.init_app(app, db)
+    group_commit.init_app(app, db)
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        init_migrate(app)
+    hash_pool.init_app(app)
+    profile_cache.init_app(app)
+    rate_limiter.init_app(app)
+    init_sessions(app, db)
 
-    from server.resources import Signup, Login, Logout, CheckSession, RecipeIndex
+    from server.resources import (
+        Signup, Login, Logout, CheckSession, RecipeIndex, RecipeDetail, RecipeBulk, RecipeExport, RecipeSearch,
+        SessionList, SessionDetail, UserRecipeIndex, MyRecipeIndex, Stats
+    )
+    from server.serializers import output_json
     api = Api(app)
+    api.representations["application/json"] = output_json
     api.add_resource(Signup, '/signup')
     api.add_resource(Login, '/login')
     api.add_resource(Logout, '/logout')
     api.add_resource(CheckSession, '/check_session')
     api.add_resource(RecipeIndex, '/recipes')
+    api.add_resource(RecipeDetail, '/recipes/<int:recipe_id>')
+    api.add_resource(RecipeBulk, '/recipes/bulk')
+    api.add_resource(RecipeExport, '/recipes/export')
+    api.add_resource(RecipeSearch, '/recipes/search')
+    api.add_resource(SessionList, '/sessions')
+    api.add_resource(SessionDetail, '/sessions/<string:key>')
+    api.add_resource(UserRecipeIndex, '/users/<int:user_id>/recipes')
+    api.add_resource(MyRecipeIndex, '/me/recipes')
+    api.add_resource(Stats, '/stats')
+
+    metrics.init_app(app, db, api)
+    compression.init_app(app)
+
+    from server.seed import seed_bulk
+    from server.snapshots import repair_author_snapshots_command
+    from server.stats import rebuild_stats_command
+    app.cli.add_command(seed_bulk)
+    app.cli.add_command(repair_author_snapshots_command)
+    app.cli.add_command(rebuild_stats_command)
 
     return app
 
-app = create_app()
+def init_migrate(app):
+    # Flask-Migrate pulls in Alembic and Mako, a large share of cold start,
+    # so it's only set up for `flask db ...` and the production launcher.
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+def __getattr__(name):
+    # The default app is built on first use, so importing server.app for
+    # db, the models or create_app() doesn't pay for a whole application.
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == '__main__':
-    app.run(port=5555, debug=True)
+    create_app().run(port=5555, debug=True)
@@ -0,0 +1,284 @@
+"""ASGI serving mode.
+
+    uvicorn server.asgi:app --port 5555
+
+GET /check_session and GET /recipes run natively on the event loop against
+an aiosqlite engine, so a slow or idle connection holds a coroutine rather
+than an OS thread. Every other route is handed to the Flask app through a
+WSGI bridge on a bounded thread pool; bcrypt on those routes still runs in
+the hash pool's worker processes.
+
+Needs aiosqlite, greenlet and an ASGI server such as uvicorn, all in the
+Pipfile; the WSGI app in server.app never imports them.
+"""
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl
+
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import Headers, MultiDict
+from werkzeug.http import parse_cookie
+
+from server.app import app as flask_app, compression, profile_cache
+from server.database import engine_options, install_sqlite_pragmas
+from server.models import User, SessionRecord, TableVersion
+from server.resources import (
+    listing_etag, validator_headers, not_modified, recipe_listing, paginate
+)
+from server.serializers import user_schema, dumps
+from server.sessions import CachedSessionBackend, SqlSessionBackend, session_key
+
+
+def build_environ(scope, body):
+    """WSGI environ for an ASGI HTTP scope, per PEP 3333."""
+    root_path = scope.get("root_path", "")
+    path = scope["path"]
+    if path.startswith(root_path):
+        path = path[len(root_path):]
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": root_path.encode("utf-8").decode("latin-1"),
+        "PATH_INFO": path.encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+        # The whole body is already spooled, so it can be read to EOF even
+        # without a Content-Length (chunked uploads).
+        "wsgi.input_terminated": True,
+    }
+    if scope.get("client"):
+        environ["REMOTE_ADDR"], environ["REMOTE_PORT"] = scope["client"][0], str(scope["client"][1])
+    for raw_name, raw_value in scope["headers"]:
+        name = raw_name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = "HTTP_" + name
+        value = raw_value.decode("latin-1")
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class WsgiBridge:
+    """Runs the Flask app for one ASGI request on a bounded thread pool.
+
+    The request body is spooled to a temporary file first. The response
+    is streamed back chunk by chunk, each send awaited from the worker
+    thread, so a slow client holds back a streamed export rather than
+    buffering it."""
+
+    def __init__(self, wsgi_app, threads, spool_size=1024 * 1024):
+        self.wsgi_app = wsgi_app
+        self.spool_size = spool_size
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="wsgi")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                body.close()
+                return
+            body.write(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        body.seek(0)
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(self.executor, self.run, scope, body, send, loop)
+        finally:
+            body.close()
+
+    def run(self, scope, body, send, loop):
+        sync_send = lambda message: asyncio.run_coroutine_threadsafe(send(message), loop).result()
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            if exc_info and response.get("started"):
+                raise exc_info[1].with_traceback(exc_info[2])
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers
+            ]
+
+        def start():
+            if not response.get("started"):
+                response["started"] = True
+                sync_send({
+                    "type": "http.response.start",
+                    "status": response["status"],
+                    "headers": response["headers"],
+                })
+
+        result = self.wsgi_app(build_environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if chunk:
+                    start()
+                    sync_send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            if hasattr(result, "close"):
+                result.close()
+        start()
+        sync_send({"type": "http.response.body", "body": b""})
+
+
+class AsyncRequest:
+    def __init__(self, scope):
+        self.headers = Headers(
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in scope["headers"]
+        )
+        self.args = MultiDict(parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True))
+        self.cookies = parse_cookie(self.headers.get("Cookie", ""))
+        host = self.headers.get("Host") or "{}:{}".format(*scope.get("server", ("localhost", 80)))
+        self.full_path = f"{scope['path']}?{scope['query_string'].decode('latin-1')}"
+        self.base_url = f"{scope.get('scheme', 'http')}://{host}{scope.get('root_path', '')}{scope['path']}"
+
+
+class AsyncApp:
+    """ASGI application: native async handlers for the hot read endpoints,
+    the WSGI bridge for everything else.
+
+    Native handlers only read the session, so they never refresh its expiry;
+    the next request through Flask does that."""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        config = wsgi_app.config
+        url = make_url(config["SQLALCHEMY_DATABASE_URI"]).set(drivername="sqlite+aiosqlite")
+        self.engine = create_async_engine(url, **engine_options(url, config.get("SQLALCHEMY_ENGINE_OPTIONS")))
+        install_sqlite_pragmas(self.engine.sync_engine, config.get("SQLITE_PRAGMAS"))
+        self.bridge = WsgiBridge(wsgi_app, config.get("ASGI_WSGI_THREADS", 8))
+        self.routes = {
+            ("GET", "/check_session"): self.check_session,
+            ("GET", "/recipes"): self.recipe_index,
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self.lifespan(receive, send)
+
+        handler = self.routes.get((scope.get("method"), scope.get("path")))
+        if scope["type"] != "http" or handler is None:
+            return await self.bridge(scope, receive, send)
+
+        request = AsyncRequest(scope)
+        with self.wsgi_app.app_context():
+            status, payload, headers = await handler(request)
+            body = b"" if payload is None else (dumps(payload) + "\n").encode("utf-8")
+            if payload is not None and self.wsgi_app.config["COMPRESSION_ENABLED"]:
+                body, encoded = compression.compress(
+                    body, "application/json", request.headers.get("Accept-Encoding"),
+                    etag=headers.get("ETag"), path=request.full_path
+                )
+                headers.update(encoded)
+        raw_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers.items()]
+        if payload is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(body)).encode("ascii")))
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def close(self):
+        await self.engine.dispose()
+        self.bridge.executor.shutdown(wait=False)
+
+    async def session_user(self, conn, request):
+        interface = self.wsgi_app.session_interface
+        token = interface.token_from_cookie(
+            self.wsgi_app, request.cookies.get(interface.get_cookie_name(self.wsgi_app))
+        )
+        if token is None:
+            return None
+
+        key = session_key(token)
+        backend = interface.backend
+        cache = None
+        if isinstance(backend, CachedSessionBackend):
+            # Native routes read the cache, then the table over aiosqlite,
+            # so a cache miss doesn't block the event loop.
+            cache, backend = backend, backend.backend
+        record = None if cache is None else cache.cached(key)
+        if record is None and isinstance(backend, SqlSessionBackend):
+            t = SessionRecord.__table__
+            row = (await conn.execute(
+                select(t.c.data, t.c.expires_at).where(t.c.key == key)
+            )).first()
+            record = None if row is None else (json.loads(row.data), row.expires_at)
+            if record is not None and cache is not None:
+                cache.remember(key, *record)
+        elif record is None:
+            record = backend.load(key)
+        if record is None or record[1] <= time.time():
+            return None
+        return record[0].get("user_id")
+
+    async def check_session(self, request):
+        async with self.engine.connect() as conn:
+            user_id = await self.session_user(conn, request)
+            if user_id:
+                profile, key = profile_cache.lookup(user_id)
+                if profile is not None:
+                    return 200, profile, {}
+                row = (await conn.execute(
+                    user_schema.statement(User.id).where(User.id == user_id)
+                )).first()
+                if row is not None:
+                    profile = user_schema.dump_row(row, 1)
+                    profile_cache.store(key, profile)
+                    return 200, profile, {}
+        return 401, {"error": "Unauthorized"}, {}
+
+    async def recipe_index(self, request):
+        args = request.args
+        async with self.engine.connect() as conn:
+            if not await self.session_user(conn, request):
+                return 401, {"error": "Unauthorized"}, {}
+            try:
+                stmt, limit, schema = recipe_listing(args)
+            except ValueError as e:
+                return 400, {"error": str(e)}, {}
+
+            version, last_modified = (await conn.execute(
+                select(TableVersion.version, TableVersion.changed_at).where(TableVersion.name == "recipes")
+            )).one()
+            etag = listing_etag("recipes", version, args)
+            headers = validator_headers(etag, last_modified)
+            if not_modified(etag, last_modified, request.headers):
+                return 304, None, headers
+
+            rows = (await conn.execute(stmt)).all()
+        rows = paginate(rows, limit, args, request.base_url, headers)
+        return 200, [schema.dump_row(row, 1) for row in rows], headers
+
+
+app = AsyncApp(flask_app)
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run(app, port=5555)
@@ -0,0 +1,172 @@
+"""Latency and throughput benchmark for every API resource.
+
+    python -m server.benchmarks.api --users 50 --recipes 2000
+    python -m server.benchmarks.api --update-baseline
+
+Seeds a temporary database with Faker data, then drives /signup, /login,
+/check_session and /recipes through the Flask test client and through a
+threaded Werkzeug server on a real socket. Prints p50/p95/p99 latency,
+throughput and peak RSS as JSON. With a baseline file present, exits
+non-zero when any scenario regresses by more than --threshold.
+"""
+import argparse
+import http.cookiejar
+import itertools
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+from werkzeug.serving import make_server
+
+from server.app import create_app, db
+from server.benchmarks.common import (
+    load_baseline, peak_rss_mb, regressions, save_baseline, summarize
+)
+from server.config import TestingConfig
+from server.seed import seed_fake
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "api.json")
+PASSWORD = "benchmark-password"
+
+
+def bench_config(path, rounds):
+    class BenchmarkConfig(TestingConfig):
+        TESTING = False
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+        BCRYPT_LOG_ROUNDS = rounds
+        SECRET_KEY = "benchmark"
+
+    return BenchmarkConfig
+
+
+def scenarios(usernames, counter):
+    def signup():
+        return "POST", "/signup", {"username": f"bench-{next(counter)}", "password": PASSWORD}
+
+    def login():
+        return "POST", "/login", {"username": usernames[0], "password": PASSWORD}
+
+    def check_session():
+        return "GET", "/check_session", None
+
+    def recipes():
+        return "GET", "/recipes?limit=20", None
+
+    return {"signup": signup, "login": login, "check_session": check_session, "recipes": recipes}
+
+
+def run_test_client(app, usernames, requests):
+    results = {}
+    counter = itertools.count()
+    for name, make_request in scenarios(usernames, counter).items():
+        client = app.test_client()
+        client.post("/login", json={"username": usernames[0], "password": PASSWORD})
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(requests):
+            method, path, body = make_request()
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, json=body)
+            latencies.append(time.perf_counter() - t0)
+            assert response.status_code < 400, (name, response.status_code)
+        results[f"test_client.{name}"] = summarize(latencies, time.perf_counter() - started)
+    return results
+
+
+def run_wsgi(app, usernames, requests, threads):
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    base = f"http://127.0.0.1:{server.server_port}"
+    serving = threading.Thread(target=server.serve_forever, daemon=True)
+    serving.start()
+
+    results = {}
+    counter = itertools.count(10 ** 6)
+    try:
+        for name, make_request in scenarios(usernames, counter).items():
+            latencies = []
+            lock = threading.Lock()
+
+            def worker():
+                opener = urllib.request.build_opener(
+                    urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+                )
+                send(opener, base, "POST", "/login", {"username": usernames[0], "password": PASSWORD})
+                mine = []
+                for _ in range(requests // threads):
+                    method, path, body = make_request()
+                    t0 = time.perf_counter()
+                    send(opener, base, method, path, body)
+                    mine.append(time.perf_counter() - t0)
+                with lock:
+                    latencies.extend(mine)
+
+            workers = [threading.Thread(target=worker) for _ in range(threads)]
+            started = time.perf_counter()
+            for thread in workers:
+                thread.start()
+            for thread in workers:
+                thread.join()
+            results[f"wsgi.{name}"] = summarize(latencies, time.perf_counter() - started)
+    finally:
+        server.shutdown()
+    return results
+
+
+def send(opener, base, method, path, body):
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(
+        base + path, data=data, method=method,
+        headers={"Content-Type": "application/json"} if data else {}
+    )
+    with opener.open(request) as response:
+        return response.read()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(bench_config(os.path.join(tmp, "bench.db"), args.bcrypt_rounds))
+        with app.app_context():
+            db.create_all()
+            usernames = seed_fake(args.users, args.recipes, password=PASSWORD, seed=args.seed)
+
+        results = run_test_client(app, usernames, args.requests)
+        results.update(run_wsgi(app, usernames, args.requests, args.threads))
+        with app.app_context():
+            db.engine.dispose()
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(json.dumps(results, indent=2, sort_keys=True))
+
+    if args.update_baseline:
+        save_baseline(args.baseline, results)
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        return 0
+    problems = regressions(results, baseline, args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
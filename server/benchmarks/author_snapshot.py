@@ -0,0 +1,133 @@
+"""Join-free listing reads against write amplification on profile edits.
+
+    python -m server.benchmarks.author_snapshot --recipes 50000
+
+Seeds a temporary database, then reports:
+
+    reads        median time to read and dump every recipe, and a 100-row
+                 GET /recipes page, with the author joined from users and
+                 with it read from the recipes.author_* snapshot
+    profile-edit median time to change one user's bio, for users with
+                 0 / 10 / 100 / 1000 recipes; the snapshot trigger rewrites
+                 every one of the author's recipes
+    bulk-insert  rows/s for Core inserts that carry the snapshot and ones
+                 that leave it to the insert trigger, as the app does
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import insert, update
+
+from server.app import create_app, db
+from server.config import TestingConfig
+from server.models import User, Recipe
+from server.seed import recipe_rows
+from server.serializers import recipe_schema
+
+WORDS = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+AUTHOR_SIZES = (0, 10, 100, 1000)
+
+
+def median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return round(statistics.median(timings) * 1000, 2)
+
+
+def read_costs(app, client, repeats):
+    results = {}
+    for mode, snapshot in (("join", False), ("snapshot", True)):
+        app.config["RECIPE_AUTHOR_SNAPSHOT"] = snapshot
+        stmt = recipe_schema.statement(Recipe.id, snapshot=snapshot).order_by(Recipe.id)
+        scan = lambda: [recipe_schema.dump_row(row, 1) for row in db.session.execute(stmt)]
+        page = lambda: client.get("/recipes?limit=100")
+        results[mode] = {
+            "full_scan_ms": median_ms(scan, repeats),
+            "page_ms": median_ms(page, repeats * 10),
+        }
+    return results
+
+
+def profile_edit_costs(user_ids, repeats):
+    results = {}
+    for size, user_id in zip(AUTHOR_SIZES, user_ids):
+        counter = iter(range(10**9))
+
+        def edit():
+            db.session.execute(update(User).where(User.id == user_id).values(bio=f"bio {next(counter)}"))
+            db.session.commit()
+
+        results[f"{size}_recipes_ms"] = median_ms(edit, repeats)
+    return results
+
+
+def bulk_insert_costs(user_id, rows, seed):
+    results = {}
+    author = {"author_username": "edit0", "author_image_url": "", "author_bio": "x" * 80}
+    for mode, extra in (("with_snapshot", author), ("trigger_fill", {})):
+        values = [dict(row, user_id=user_id, **extra) for row in recipe_rows(99, rows, (1, 1), WORDS, seed)]
+        t0 = time.perf_counter()
+        db.session.execute(insert(Recipe), values)
+        db.session.commit()
+        results[f"{mode}_rows_per_s"] = round(rows / (time.perf_counter() - t0))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--insert-rows", type=int, default=20000)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class SnapshotConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        app = create_app(SnapshotConfig)
+        with app.app_context():
+            db.create_all()
+            users = [User(username=f"bench{i}", bio="x" * 80) for i in range(args.users)]
+            editors = [User(username=f"edit{size}", bio="x" * 80) for size in AUTHOR_SIZES]
+            for user in users + editors:
+                user._password_hash = "unused"
+            db.session.add_all(users + editors)
+            db.session.commit()
+
+            user_ids = (users[0].id, users[-1].id)
+            for index, start in enumerate(range(0, args.recipes, 5000)):
+                count = min(5000, args.recipes - start)
+                db.session.execute(insert(Recipe), recipe_rows(index, count, user_ids, WORDS, args.seed))
+            for editor, size in zip(editors, AUTHOR_SIZES):
+                if size:
+                    rows = recipe_rows(1000 + size, size, (editor.id, editor.id), WORDS, args.seed)
+                    db.session.execute(insert(Recipe), rows)
+            db.session.commit()
+            editor_ids = [editor.id for editor in editors]
+
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["user_id"] = user_ids[0]
+
+            results = {
+                "reads": read_costs(app, client, args.repeats),
+                "profile_edit": profile_edit_costs(editor_ids, args.repeats),
+                "bulk_insert": bulk_insert_costs(editor_ids[0], args.insert_rows, args.seed),
+            }
+            db.engine.dispose()
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
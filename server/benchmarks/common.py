@@ -0,0 +1,62 @@
+import json
+import os
+import resource
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, elapsed):
+    values = sorted(latencies)
+    return {
+        "requests": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+        "throughput_rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux.
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def load_baseline(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(path, results):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def regressions(results, baseline, threshold):
+    """Compare peak RSS and each scenario's p95 latency and throughput with
+    the baseline and return a message for every metric worse than threshold
+    (a fraction, e.g. 0.25 for 25%)."""
+    problems = []
+    rss, previous_rss = results.get("peak_rss_mb"), baseline.get("peak_rss_mb")
+    if rss and previous_rss and rss > previous_rss * (1 + threshold):
+        problems.append(f"peak RSS {rss}MB vs baseline {previous_rss}MB")
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if not isinstance(current, dict) or not isinstance(previous, dict):
+            continue
+        if "p95_ms" in previous and current["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            problems.append(f"{name}: p95 {current['p95_ms']}ms vs baseline {previous['p95_ms']}ms")
+        if "throughput_rps" in previous and \
+                current["throughput_rps"] < previous["throughput_rps"] * (1 - threshold):
+            problems.append(
+                f"{name}: throughput {current['throughput_rps']}rps vs baseline {previous['throughput_rps']}rps"
+            )
+    return problems
@@ -0,0 +1,128 @@
+"""Bytes saved against CPU spent compressing recipe listings.
+
+    python -m server.benchmarks.compression --limits 20 100 --levels 1 6 9
+
+Seeds a temporary database and renders GET /recipes pages of each --limit.
+For every coding and level it reports the body size before and after,
+the ratio and the median time zlib takes per page. It then times the whole
+request through the Flask test client three ways:
+
+    identity      no Accept-Encoding
+    gzip-miss     gzip with the compressed-body cache cleared each time
+    gzip-hit      gzip served from the cache (the same ETag every time)
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+from faker import Faker
+from sqlalchemy import insert
+
+from server.app import create_app, db
+from server.benchmarks.common import summarize
+from server.compression import ENCODINGS, encode
+from server.config import TestingConfig
+from server.models import User, Recipe
+from server.seed import recipe_rows
+
+
+def median_ms(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def codec_costs(body, levels, repeats):
+    results = {}
+    for encoding in ENCODINGS:
+        for level in levels:
+            compressed = encode(body, encoding, level)
+            results[f"{encoding}-{level}"] = {
+                "bytes": len(compressed),
+                "ratio": round(len(body) / len(compressed), 2),
+                "compress_ms": median_ms(lambda: encode(body, encoding, level), repeats),
+            }
+    return results
+
+
+def request_latency(app, client, url, repeats):
+    cache = app.extensions["compression"]
+    scenarios = {
+        "identity": ({}, lambda: None),
+        "gzip-miss": ({"Accept-Encoding": "gzip"}, cache._entries.clear),
+        "gzip-hit": ({"Accept-Encoding": "gzip"}, lambda: None),
+    }
+    results = {}
+    for name, (headers, before) in scenarios.items():
+        client.get(url, headers=headers)
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(repeats):
+            before()
+            t0 = time.perf_counter()
+            response = client.get(url, headers=headers)
+            latencies.append(time.perf_counter() - t0)
+        results[name] = summarize(latencies, time.perf_counter() - started)
+        results[name]["bytes"] = len(response.data)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=2000)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--limits", type=int, nargs="+", default=[20, 100])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    fake = Faker()
+    fake.seed_instance(args.seed)
+    words = fake.words(nb=500, unique=True)
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        class CompressionConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        app = create_app(CompressionConfig)
+        with app.app_context():
+            db.create_all()
+            users = [User(username=f"bench{i}", bio=fake.paragraph()) for i in range(args.users)]
+            for user in users:
+                user._password_hash = "unused"
+            db.session.add_all(users)
+            db.session.commit()
+            user_ids = (users[0].id, users[-1].id)
+            db.session.execute(insert(Recipe), recipe_rows(0, args.recipes, user_ids, words, args.seed))
+            db.session.commit()
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session["user_id"] = user_ids[0]
+
+        for limit in args.limits:
+            url = f"/recipes?limit={limit}"
+            body = client.get(url).data
+            results[f"limit={limit}"] = {
+                "identity_bytes": len(body),
+                "codecs": codec_costs(body, args.levels, args.repeats),
+                "requests": request_latency(app, client, url, args.repeats),
+            }
+
+        with app.app_context():
+            db.engine.dispose()
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
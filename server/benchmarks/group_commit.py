@@ -0,0 +1,114 @@
+"""Write throughput of POST /recipes with and without group commit.
+
+    python -m server.benchmarks.group_commit --posters 50 --posts 20
+
+For each mode, 50 threads (--posters) each post --posts recipes through the
+Flask test client against a fresh temporary database and we report
+writes/s, latency percentiles and the number of COMMITs the database saw:
+
+    per-request     GROUP_COMMIT_ENABLED off: one commit per request
+    group-<n>ms     group commit with a GROUP_COMMIT_WINDOW_MS of n
+
+--synchronous picks the SQLite durability level. NORMAL (the app default
+with WAL) only syncs at checkpoints; FULL syncs every commit, which is the
+cost group commit exists to share.
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+
+from server.app import create_app, db, group_commit
+from server.benchmarks.common import summarize
+from server.config import TestingConfig
+from server.models import User
+
+INSTRUCTIONS = "Mix the berries into the flour and bake until golden brown. " * 3
+
+
+def run_mode(window_ms, posters, posts, synchronous):
+    with tempfile.TemporaryDirectory() as tmp:
+        class GroupCommitConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            SQLITE_PRAGMAS = dict(TestingConfig.SQLITE_PRAGMAS, synchronous=synchronous)
+            GROUP_COMMIT_ENABLED = window_ms is not None
+            GROUP_COMMIT_WINDOW_MS = window_ms or 0
+            SQLALCHEMY_ENGINE_OPTIONS = dict(
+                TestingConfig.SQLALCHEMY_ENGINE_OPTIONS, pool_size=posters, max_overflow=0
+            )
+
+        app = create_app(GroupCommitConfig)
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench", _password_hash="unused")
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            engine = db.engine
+
+        clients = []
+        for _ in range(posters):
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session["user_id"] = user_id
+            clients.append(client)
+
+        commits = []
+        event.listen(engine, "commit", commits.append)
+        latencies = []
+        failures = []
+        barrier = threading.Barrier(posters + 1)
+
+        def poster(client):
+            barrier.wait()
+            for i in range(posts):
+                t0 = time.perf_counter()
+                response = client.post("/recipes", json={
+                    "title": f"Recipe {i}", "instructions": INSTRUCTIONS, "minutes_to_complete": i
+                })
+                latencies.append(time.perf_counter() - t0)
+                if response.status_code != 201:
+                    failures.append(response.status_code)
+
+        threads = [threading.Thread(target=poster, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        group_commit.shutdown(app)
+        engine.dispose()
+
+    results = summarize(latencies, elapsed)
+    results["commits"] = len(commits)
+    results["failures"] = len(failures)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posters", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=20)
+    parser.add_argument("--windows", type=float, nargs="+", default=[1, 2, 5])
+    parser.add_argument("--synchronous", choices=["OFF", "NORMAL", "FULL"], default="FULL")
+    args = parser.parse_args(argv)
+
+    modes = {"per-request": None}
+    modes.update({f"group-{window:g}ms": window for window in args.windows})
+    results = {
+        name: run_mode(window, args.posters, args.posts, args.synchronous)
+        for name, window in modes.items()
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
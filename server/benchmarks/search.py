@@ -0,0 +1,98 @@
+"""Search latency as the recipes table grows.
+
+    python -m server.benchmarks.search --sizes 1000 10000 100000
+
+For each size, seeds a temporary database with seed-bulk style recipes,
+then times /recipes/search for random single-word and two-word prefix
+queries through the Flask test client.
+
+BM25 has to score every matching row, so latency follows the number of
+matches rather than the table size. --vocabulary controls how selective
+terms are: with Faker's ~500 lorem words every term matches a fixed
+fraction of the table, which is the worst case.
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from faker import Faker
+from sqlalchemy import insert
+
+from server.app import create_app, db
+from server.benchmarks.common import summarize
+from server.config import TestingConfig
+from server.models import User, Recipe
+from server.seed import recipe_rows
+
+
+def vocabulary(size, seed):
+    fake = Faker()
+    fake.seed_instance(seed)
+    base = fake.words(nb=500, unique=True)
+    if size <= len(base):
+        return base[:size]
+    rng = random.Random(seed)
+    words = set(base)
+    while len(words) < size:
+        words.add(rng.choice(base) + rng.choice(base))
+    return sorted(words)
+
+
+def run_size(size, queries, seed, vocabulary_size):
+    words = vocabulary(vocabulary_size, seed)
+    rng = random.Random(seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class SearchConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        app = create_app(SearchConfig)
+        with app.app_context():
+            db.create_all()
+            user = User(username="bench")
+            user.password_hash = "password"
+            db.session.add(user)
+            db.session.commit()
+            for index, start in enumerate(range(0, size, 5000)):
+                rows = recipe_rows(index, min(5000, size - start), (user.id, user.id), words, seed)
+                db.session.execute(insert(Recipe), rows)
+            db.session.commit()
+
+        client = app.test_client()
+        client.post("/login", json={"username": "bench", "password": "password"})
+        latencies = []
+        started = time.perf_counter()
+        for _ in range(queries):
+            terms = rng.sample(words, rng.randint(1, 2))
+            q = " ".join(terms[:-1] + [terms[-1][:max(3, len(terms[-1]) - 2)]])
+            t0 = time.perf_counter()
+            response = client.get("/recipes/search", query_string={"q": q, "limit": 20})
+            latencies.append(time.perf_counter() - t0)
+            assert response.status_code == 200
+        result = summarize(latencies, time.perf_counter() - started)
+        with app.app_context():
+            db.engine.dispose()
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--vocabulary", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    results = {
+        str(size): run_size(size, args.queries, args.seed, args.vocabulary)
+        for size in args.sizes
+    }
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Serialization cost of a large recipe listing.
+
+    python -m server.benchmarks.serialize --recipes 10000
+
+Seeds a temporary database, then renders every recipe (with its author)
+to a JSON string through each path and reports the median time and the
+peak memory allocated per render:
+
+    orm-dict      ORM objects with a selectin author load and hand-built
+                  dicts, as the listings did before the schema layer
+    orm-schema    the same objects dumped through RecipeSchema
+    rows-schema   Core row tuples mapped by RecipeSchema.dump_row
+    rows-orjson   as rows-schema, encoded with orjson (if installed)
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+
+from server.app import create_app, db
+from server.config import TestingConfig
+from server.models import User, Recipe
+from server.seed import recipe_rows
+from server.serializers import orjson, recipe_schema, dumps
+
+
+def orm_dict():
+    recipes = Recipe.query.options(selectinload(Recipe.user)).order_by(Recipe.id).all()
+    return json.dumps([
+        {
+            "id": r.id,
+            "title": r.title,
+            "instructions": r.instructions,
+            "minutes_to_complete": r.minutes_to_complete,
+            "user": {
+                "id": r.user.id,
+                "username": r.user.username,
+                "image_url": r.user.image_url,
+                "bio": r.user.bio,
+            },
+        } for r in recipes
+    ], separators=(",", ":"))
+
+
+def orm_schema():
+    recipes = Recipe.query.options(selectinload(Recipe.user)).order_by(Recipe.id).all()
+    return dumps([recipe_schema.dump(r) for r in recipes])
+
+
+def rows_schema():
+    rows = db.session.execute(recipe_schema.statement(Recipe.id).order_by(Recipe.id))
+    return dumps([recipe_schema.dump_row(row, 1) for row in rows])
+
+
+def measure(app, backend, render, repeats):
+    app.config["JSON_BACKEND"] = backend
+    timings = []
+    for _ in range(repeats):
+        db.session.expunge_all()
+        t0 = time.perf_counter()
+        render()
+        timings.append(time.perf_counter() - t0)
+
+    # Allocation is traced in a separate run; tracing slows every path.
+    db.session.expunge_all()
+    tracemalloc.start()
+    render()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "peak_alloc_mb": round(peak / 2**20, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--recipes", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1234)
+    args = parser.parse_args(argv)
+
+    paths = {
+        "orm-dict": ("stdlib", orm_dict),
+        "orm-schema": ("stdlib", orm_schema),
+        "rows-schema": ("stdlib", rows_schema),
+    }
+    if orjson is not None:
+        paths["rows-orjson"] = ("orjson", rows_schema)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        class SerializeConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+        app = create_app(SerializeConfig)
+        with app.app_context():
+            db.create_all()
+            users = [User(username=f"bench{i}", bio="x" * 80) for i in range(args.users)]
+            for user in users:
+                user._password_hash = "unused"
+            db.session.add_all(users)
+            db.session.commit()
+            user_ids = (users[0].id, users[-1].id)
+            words = ["alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel"]
+            for index, start in enumerate(range(0, args.recipes, 5000)):
+                count = min(5000, args.recipes - start)
+                db.session.execute(insert(Recipe), recipe_rows(index, count, user_ids, words, args.seed))
+            db.session.commit()
+
+            results = {
+                name: measure(app, backend, render, args.repeats)
+                for name, (backend, render) in paths.items()
+            }
+            db.engine.dispose()
+
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
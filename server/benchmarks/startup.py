@@ -0,0 +1,143 @@
+"""Cold start: import, create_app() and the first request.
+
+    python -m server.benchmarks.startup --runs 5
+    python -m server.benchmarks.startup --update-baseline
+
+Each run is a fresh interpreter. The probe times `import server.app`,
+create_app() and a first POST /login (which opens the first database
+connection), and records which deliberately deferred modules got loaded
+anyway. A separate run under -X importtime breaks the import down by
+top-level package. The best of --runs is compared with the stored baseline
+and the command exits non-zero when a phase is over budget. The baseline
+is per machine: refresh it with --update-baseline after adding startup work.
+The test suite only checks the deferred imports, which do not depend on
+the machine.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from server.benchmarks.common import load_baseline, save_baseline
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "startup.json")
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PHASES = ("import_ms", "create_app_ms", "first_request_ms")
+
+# Only the CLI, seeding and the ASGI mode should load these.
+DEFERRED = ("flask_migrate", "alembic", "mako", "faker", "aiosqlite", "uvicorn")
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import server.app
+t1 = time.perf_counter()
+from server.config import TestingConfig
+class ProbeConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = sys.argv[1]
+app = server.app.create_app(ProbeConfig)
+t2 = time.perf_counter()
+response = app.test_client().post("/login", json={"username": "nobody", "password": "x"})
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "create_app_ms": (t2 - t1) * 1000,
+    "first_request_ms": (t3 - t2) * 1000,
+    "status": response.status_code,
+    "deferred_loaded": sorted(set(m.split(".")[0] for m in sys.modules) & set(%r)),
+}))
+""" % (DEFERRED,)
+
+
+def prepare_database(path):
+    from server.app import create_app, db
+    from server.config import TestingConfig
+
+    class PrepareConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{path}"
+
+    app = create_app(PrepareConfig)
+    with app.app_context():
+        db.create_all()
+        db.engine.dispose()
+    return PrepareConfig.SQLALCHEMY_DATABASE_URI
+
+
+def probe(uri, *flags):
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, "server")]))
+    env.pop("FLASK_RUN_FROM_CLI", None)
+    completed = subprocess.run(
+        [sys.executable, *flags, "-c", PROBE, uri],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.splitlines()[-1]), completed.stderr
+
+
+def import_breakdown(stderr, top=10):
+    # Self time summed per top-level package, so nested imports are charged
+    # to the package that owns them rather than to whoever imported first.
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us) / 1000
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {package: round(ms, 1) for package, ms in ranked}
+
+
+def measure(runs=5):
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = prepare_database(os.path.join(tmp, "startup.db"))
+        samples = [probe(uri)[0] for _ in range(runs)]
+        _, stderr = probe(uri, "-X", "importtime")
+
+    results = {phase: round(min(s[phase] for s in samples), 1) for phase in PHASES}
+    results["status"] = samples[0]["status"]
+    results["deferred_loaded"] = sorted(set().union(*(s["deferred_loaded"] for s in samples)))
+    results["import_breakdown_ms"] = import_breakdown(stderr)
+    return results
+
+
+def over_budget(results, baseline, threshold):
+    """Return a message for every phase slower than baseline * (1 + threshold)."""
+    problems = []
+    for phase in PHASES:
+        previous = baseline.get(phase)
+        if previous and results[phase] > previous * (1 + threshold):
+            problems.append(f"{phase}: {results[phase]}ms vs baseline {previous}ms")
+    if results["deferred_loaded"]:
+        problems.append(f"deferred modules imported at startup: {', '.join(results['deferred_loaded'])}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    results = measure(args.runs)
+    print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        save_baseline(args.baseline, {phase: results[phase] for phase in PHASES})
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        return 0
+    problems = over_budget(results, baseline, args.threshold)
+    for problem in problems:
+        print(f"REGRESSION {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
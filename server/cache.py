@@ -0,0 +1,197 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class CacheBackend:
+    """Minimal key/value interface shared by the in-process and shared
+    caches. Counters live outside the LRU so they are never evicted."""
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+    def counter(self, key):
+        raise NotImplementedError
+
+
+class LocalCache(CacheBackend):
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            value = self._counters.get(key, 0) + 1
+            self._counters[key] = value
+            return value
+
+    def counter(self, key):
+        return self._counters.get(key, 0)
+
+
+class SharedCache(CacheBackend):
+    """Adapter for a Redis-style client (get / set(ex=) / incr / delete).
+    Values are stored as JSON."""
+
+    def __init__(self, client, ttl=None, prefix="app:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        self.client.set(self.prefix + key, json.dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+    def counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return 0 if raw is None else int(raw)
+
+
+class FakeSharedClient:
+    """In-memory stand-in for a Redis client, for tests and local runs."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _live(self, key):
+        entry = self._data.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._live(key)
+            return None if entry is None else entry[0]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ex if ex else None)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            return 1 if self._data.pop(key, None) is not None else 0
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._live(key)
+            value = int(entry[0]) + 1 if entry else 1
+            self._data[key] = (str(value).encode(), entry[1] if entry else None)
+            return value
+
+    def expire(self, key, seconds):
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                return False
+            self._data[key] = (entry[0], time.monotonic() + seconds)
+            return True
+
+
+class ProfileCache:
+    """Caches the serialized profile payload per user.
+
+    Entries are addressed by a per-user version drawn from a monotonic clock.
+    Invalidating a user (or every user, after a bulk write) just moves the
+    version on, so a reader that raced a writer stores its stale payload
+    under a key nobody will look up again.
+
+    Each app keeps its own backend in app.extensions, so two apps in one
+    process never see each other's entries."""
+
+    def init_app(self, app):
+        app.config.setdefault("PROFILE_CACHE_BACKEND", "local")
+        app.config.setdefault("PROFILE_CACHE_TTL", 300)
+        app.config.setdefault("PROFILE_CACHE_MAX_ENTRIES", 10000)
+        app.config.setdefault("PROFILE_CACHE_CLIENT", None)
+
+        ttl = app.config["PROFILE_CACHE_TTL"]
+        if app.config["PROFILE_CACHE_BACKEND"] == "shared":
+            client = app.config["PROFILE_CACHE_CLIENT"]
+            if client is None:
+                raise RuntimeError("PROFILE_CACHE_BACKEND 'shared' needs PROFILE_CACHE_CLIENT.")
+            backend = SharedCache(client, ttl=ttl, prefix="profile:")
+        else:
+            backend = LocalCache(app.config["PROFILE_CACHE_MAX_ENTRIES"], ttl=ttl)
+        app.extensions["profile_cache"] = backend
+
+    @property
+    def backend(self):
+        return current_app.extensions["profile_cache"]
+
+    def lookup(self, user_id):
+        """Return (payload, key). On a miss, load the profile and pass it to
+        store() with the same key."""
+        version = self.backend.get(f"version:{user_id}")
+        if version is None:
+            version = self._bump(user_id)
+        generation = self.backend.counter("generation")
+        key = f"entry:{user_id}:{generation}:{version}"
+        return self.backend.get(key), key
+
+    def store(self, key, payload):
+        self.backend.set(key, payload)
+
+    def _bump(self, user_id):
+        version = self.backend.incr("clock")
+        self.backend.set(f"version:{user_id}", version)
+        return version
+
+    def invalidate(self, user_id):
+        self._bump(user_id)
+
+    def invalidate_all(self):
+        self.backend.incr("generation")
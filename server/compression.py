@@ -0,0 +1,100 @@
+import zlib
+
+from flask import current_app, request
+from werkzeug.http import parse_accept_header, quote_etag, unquote_etag
+
+from server.cache import LocalCache
+from server.instrumentation import timed
+
+# Preferred first when the client weights them equally.
+ENCODINGS = ("gzip", "deflate")
+
+
+def negotiate(accept_encoding):
+    """Pick a content coding from an Accept-Encoding header, or None for
+    identity. Codings the client gives q=0 are never chosen."""
+    if not accept_encoding:
+        return None
+    return parse_accept_header(accept_encoding).best_match(ENCODINGS)
+
+
+def encode(body, encoding, level):
+    # wbits 31 writes a gzip header and trailer, 15 a zlib (deflate) stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+    return compressor.compress(body) + compressor.flush()
+
+
+class Compression:
+    """Negotiated gzip/deflate for JSON responses.
+
+    Bodies under COMPRESSION_MIN_SIZE go out as they are; a small body can
+    grow once compressed and isn't worth the CPU. Responses with a strong
+    ETag name exactly one body, so their compressed bytes are cached under
+    that ETag and a hot listing page is compressed once per change rather
+    than once per request."""
+
+    def init_app(self, app):
+        app.config.setdefault("COMPRESSION_ENABLED", True)
+        app.config.setdefault("COMPRESSION_MIN_SIZE", 1024)
+        app.config.setdefault("COMPRESSION_LEVEL", 6)
+        app.config.setdefault("COMPRESSION_MIMETYPES", ["application/json", "application/x-ndjson"])
+        app.config.setdefault("COMPRESSION_CACHE_MAX_ENTRIES", 512)
+        if not app.config["COMPRESSION_ENABLED"]:
+            return
+
+        app.extensions["compression"] = LocalCache(app.config["COMPRESSION_CACHE_MAX_ENTRIES"])
+        app.after_request(self._after_request)
+
+    def compress(self, body, mimetype, accept_encoding, etag=None, path=""):
+        """Return (body, headers) for a response. headers carries Vary and,
+        when the body was compressed, Content-Encoding and a weakened ETag."""
+        config = current_app.config
+        if mimetype not in config["COMPRESSION_MIMETYPES"]:
+            return body, {}
+        headers = {"Vary": "Accept-Encoding"}
+        encoding = negotiate(accept_encoding)
+        if encoding is None or len(body) < config["COMPRESSION_MIN_SIZE"]:
+            return body, headers
+
+        tag, weak = unquote_etag(etag) if etag else (None, True)
+        cache = current_app.extensions["compression"]
+        key = f"{encoding}:{path}:{tag}"
+        compressed = cache.get(key) if not weak else None
+        if compressed is None:
+            with timed("compress"):
+                compressed = encode(body, encoding, config["COMPRESSION_LEVEL"])
+            if not weak:
+                cache.set(key, compressed)
+
+        headers["Content-Encoding"] = encoding
+        if tag is not None:
+            # Each coding is a different representation of the same
+            # resource, so the tag can only promise weak equivalence.
+            headers["ETag"] = quote_etag(tag, weak=True)
+        return compressed, headers
+
+    def _after_request(self, response):
+        if (
+            response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        body, headers = self.compress(
+            response.get_data(),
+            response.mimetype,
+            request.headers.get("Accept-Encoding"),
+            etag=response.headers.get("ETag"),
+            path=request.full_path,
+        )
+        if "Content-Encoding" in headers:
+            response.set_data(body)
+        for name, value in headers.items():
+            if name == "Vary":
+                response.vary.add(value)
+            else:
+                response.headers[name] = value
+        return response
@@ -2,8 +2,118 @@ import os
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
+def hash_pool_workers():
+    # One bcrypt process per core across all server workers; gunicorn_conf
+    # reads the same WEB_CONCURRENCY.
+    cores = os.cpu_count() or 1
+    return max(1, cores // int(os.environ.get("WEB_CONCURRENCY", cores)))
+
 class Config:
     SQLALCHEMY_DATABASE_URI = f"sqlite:///{os.path.join(basedir, 'app.db')}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    SECRET_KEY = 'your-secret-key'
-    JSONIFY_PRETTYPRINT_REGULAR = True
+    SECRET_KEY = os.environ.get('SECRET_KEY', 'your-secret-key')
+    JSONIFY_PRETTYPRINT_REGULAR = False
+    RESTFUL_JSON = {"separators": (",", ":")}
+    RECIPES_PAGE_SIZE = 20
+    RECIPES_MAX_PAGE_SIZE = 100
+    JSON_BACKEND = "auto"
+    # Switches only the listing read path to recipes.author_*. The triggers
+    # that maintain those columns run on every write either way, so the
+    # snapshots are current whenever this is turned on.
+    RECIPE_AUTHOR_SNAPSHOT = False
+    RECIPES_EXPORT_BATCH_SIZE = 500
+    COMPRESSION_ENABLED = True
+    COMPRESSION_MIN_SIZE = 1024
+    COMPRESSION_LEVEL = 6
+    COMPRESSION_CACHE_MAX_ENTRIES = 512
+    BCRYPT_LOG_ROUNDS = 12
+    HASH_POOL_WORKERS = 2
+    HASH_POOL_QUEUE_DEPTH = 16
+    HASH_POOL_TIMEOUT = 5.0
+    METRICS_ENABLED = False
+    ASGI_WSGI_THREADS = 8
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_BACKEND = "memory"
+    RATE_LIMIT_WINDOW = 60
+    RATE_LIMIT_MAX_KEYS = 100000
+    # Proxies in front of the app that append to X-Forwarded-For; 0 trusts
+    # none, since a client could otherwise pick its own address.
+    PROXY_FIX_X_FOR = 0
+    RATE_LIMITS = {
+        "login_ip": 20,
+        "login_user": 5,
+        "signup_ip": 10,
+    }
+    PROFILE_CACHE_BACKEND = "local"
+    PROFILE_CACHE_TTL = 300
+    PROFILE_CACHE_MAX_ENTRIES = 10000
+    SESSION_BACKEND = "sql"
+    SESSION_SWEEP_INTERVAL = 100
+    SESSION_SWEEP_BATCH = 500
+    SESSION_CACHE_BACKEND = None
+    SESSION_CACHE_TTL = 60
+    GROUP_COMMIT_ENABLED = False
+    GROUP_COMMIT_WINDOW_MS = 2
+    GROUP_COMMIT_MAX_BATCH = 64
+    GROUP_COMMIT_TIMEOUT = 5.0
+    STATS_SIGNUP_DAYS = 30
+    STATS_MAX_SIGNUP_DAYS = 366
+    STATS_TOP_AUTHORS = 10
+    RECIPES_BULK_MAX_ROWS = 10000
+    RECIPES_BULK_CHUNK_SIZE = 500
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 5,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }
+    SQLALCHEMY_REPLICA_URIS = []
+    REPLICA_STICKY_SECONDS = 5
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -16000,
+        "mmap_size": 0,
+    }
+
+class DevelopmentConfig(Config):
+    RATE_LIMIT_ENABLED = False
+
+class TestingConfig(Config):
+    TESTING = True
+    RATE_LIMIT_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4
+    HASH_POOL_WORKERS = 0
+
+class ProductionConfig(Config):
+    SECRET_KEY = os.environ.get('SECRET_KEY')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', Config.SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_REPLICA_URIS = [
+        uri for uri in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if uri
+    ]
+    SESSION_COOKIE_SECURE = True
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 1))
+    HASH_POOL_WORKERS = hash_pool_workers()
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 10,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "temp_store": "MEMORY",
+    }
+
+configs = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig,
+}
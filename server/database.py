@@ -0,0 +1,44 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+# Only QueuePool takes these; in-memory SQLite gets a StaticPool, which
+# rejects them.
+QUEUE_POOL_OPTIONS = ("pool_size", "max_overflow", "pool_timeout")
+
+
+def is_memory_sqlite(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(uri, options):
+    """Return the engine options that apply to uri's pool."""
+    options = dict(options or {})
+    if is_memory_sqlite(uri):
+        for name in QUEUE_POOL_OPTIONS:
+            options.pop(name, None)
+    return options
+
+
+def install_sqlite_pragmas(engine, pragmas):
+    """Apply PRAGMAs to every new DBAPI connection on a SQLite engine.
+
+    journal_mode=WAL lets readers keep going while a writer commits; the
+    rest (synchronous, busy_timeout, cache_size, mmap_size) are per
+    connection, so they have to be set on each connect."""
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return
+    # In-memory databases can't use WAL or mmap.
+    if is_memory_sqlite(engine.url):
+        pragmas = {k: v for k, v in pragmas.items() if k not in ("journal_mode", "mmap_size")}
+
+    statements = [f"PRAGMA {name}={value}" for name, value in pragmas.items()]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
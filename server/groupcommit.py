@@ -0,0 +1,181 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from flask import current_app
+from sqlalchemy.exc import OperationalError
+
+
+class WriteUnavailable(Exception):
+    pass
+
+
+def unavailable(error):
+    # A failure of the transaction itself (the lock, the commit, the
+    # connection) says nothing about the caller's data: a 503, not a 422.
+    failure = WriteUnavailable("Database is unavailable for writes.")
+    failure.__cause__ = error
+    return failure
+
+
+class _Writer:
+    """One thread per app and process that owns the write transaction.
+
+    It takes the first queued job, waits up to GROUP_COMMIT_WINDOW_MS for
+    more (at most GROUP_COMMIT_MAX_BATCH), runs each job inside its own
+    savepoint and commits once. A job that raises only rolls back its own
+    savepoint and gets its own exception back; a failure of the batch
+    transaction (BEGIN or COMMIT) fails every job with WriteUnavailable."""
+
+    def __init__(self, app, db):
+        self.app = app
+        self.db = db
+        self.window = app.config["GROUP_COMMIT_WINDOW_MS"] / 1000
+        self.max_batch = app.config["GROUP_COMMIT_MAX_BATCH"]
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+        self.thread.start()
+
+    def submit(self, job):
+        future = Future()
+        self.jobs.put((job, future))
+        return future
+
+    def stop(self):
+        self.jobs.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.jobs.get(timeout=remaining) if remaining > 0 else self.jobs.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.jobs.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _loop(self):
+        while True:
+            first = self.jobs.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            with self.app.app_context():
+                try:
+                    self._commit(batch)
+                except Exception as e:
+                    # e.g. BEGIN IMMEDIATE timed out on a busy database.
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(unavailable(e))
+                finally:
+                    self.db.session.remove()
+
+    def _commit(self, batch):
+        session = self.db.session
+        connection = session.connection()
+        if connection.dialect.name == "sqlite":
+            # pysqlite only opens a transaction before DML, so the first
+            # SAVEPOINT would start one of its own and its RELEASE would
+            # commit. Take the write lock up front instead.
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+        outcomes = []
+        for job, future in batch:
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with session.begin_nested():
+                    outcomes.append((future, job(session), None))
+            except Exception as e:
+                outcomes.append((future, None, e))
+
+        try:
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            for future, _, _ in outcomes:
+                future.set_exception(unavailable(e))
+            return
+
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+class GroupCommit:
+    """Optional group commit for request writes.
+
+    Handlers pass run() a job that takes a session, adds and flushes its
+    rows and returns whatever the response needs (ids included). With
+    GROUP_COMMIT_ENABLED off the job runs on the request's own session and
+    commits immediately. With it on, concurrent jobs are coalesced into one
+    transaction, so one fsync covers the whole batch; each caller still gets
+    its own result or its own exception."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def init_app(self, app, db):
+        app.config.setdefault("GROUP_COMMIT_ENABLED", False)
+        app.config.setdefault("GROUP_COMMIT_WINDOW_MS", 2)
+        app.config.setdefault("GROUP_COMMIT_MAX_BATCH", 64)
+        app.config.setdefault("GROUP_COMMIT_TIMEOUT", 5.0)
+        app.extensions["group_commit"] = {"db": db, "writer": None, "pid": None}
+
+    def _writer(self, app):
+        # The writer thread doesn't survive a fork, so each process starts
+        # its own on first use.
+        state = app.extensions["group_commit"]
+        if state["pid"] != os.getpid():
+            with self._lock:
+                if state["pid"] != os.getpid():
+                    state["writer"] = _Writer(app, state["db"])
+                    state["pid"] = os.getpid()
+        return state["writer"]
+
+    def run(self, job):
+        app = current_app._get_current_object()
+        if not app.config["GROUP_COMMIT_ENABLED"]:
+            session = app.extensions["group_commit"]["db"].session
+            try:
+                result = job(session)
+            except OperationalError as e:
+                # Here the job's own flush is what waits for the write lock.
+                session.rollback()
+                raise unavailable(e)
+            try:
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                raise unavailable(e)
+            return result
+
+        future = self._writer(app).submit(job)
+        try:
+            return future.result(timeout=app.config["GROUP_COMMIT_TIMEOUT"])
+        except TimeoutError:
+            # Too late to withdraw once the writer has started the job.
+            if future.cancel():
+                raise WriteUnavailable("Write queue is backed up.")
+            return future.result()
+
+    def shutdown(self, app):
+        state = app.extensions.get("group_commit")
+        if state is None:
+            return
+        with self._lock:
+            if state["writer"] is not None and state["pid"] == os.getpid():
+                state["writer"].stop()
+            state["writer"] = None
+            state["pid"] = None
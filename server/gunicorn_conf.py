@@ -0,0 +1,99 @@
+"""Production launcher settings.
+
+    SECRET_KEY=... gunicorn -c server/gunicorn_conf.py
+
+Run from the repository root. The app is preloaded once in the master,
+which then applies pending migrations before any worker forks; with more
+than one worker it refuses to start unless rate limiting uses the shared
+store. Each worker drops the engine pool it inherited, so no SQLite
+connection is shared across processes. Workers are recycled after a number of requests (with
+jitter, so they don't all restart together) or once their RSS grows past
+a limit. SIGTERM stops accepting connections and lets in-flight requests
+finish for up to graceful_timeout seconds.
+
+Every setting can be overridden from the environment.
+"""
+import os
+import resource
+
+wsgi_app = "server.app:app"
+raw_env = ["APP_ENV=" + os.environ.get("APP_ENV", "production")]
+
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '5555')}")
+preload_app = True
+# One worker per core: gthread threads cover I/O waits, and each worker's
+# bcrypt pool (HASH_POOL_WORKERS in ProductionConfig) is sized so the whole
+# server runs about one bcrypt process per core.
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+worker_class = "gthread"
+threads = int(os.environ.get("WORKER_THREADS", 4))
+
+max_requests = int(os.environ.get("MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", max_requests // 10))
+max_worker_rss_mb = float(os.environ.get("MAX_WORKER_RSS_MB", 512))
+
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", 30))
+timeout = int(os.environ.get("WORKER_TIMEOUT", 60))
+keepalive = int(os.environ.get("KEEPALIVE", 5))
+migrate_on_start = os.environ.get("MIGRATE_ON_START", "1") == "1"
+
+
+def rss_mb():
+    # Current RSS from /proc where available; peak RSS (KiB on Linux) otherwise.
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def check_shared_state(app):
+    # Each worker is its own process, so in-memory rate-limit counters would
+    # let every worker grant the full limit.
+    config = app.config
+    if workers > 1 and config["RATE_LIMIT_ENABLED"] and config["RATE_LIMIT_BACKEND"] != "shared":
+        raise RuntimeError(
+            f"RATE_LIMIT_BACKEND {config['RATE_LIMIT_BACKEND']!r} keeps counters per process; "
+            f"with {workers} workers use 'shared' and set RATE_LIMIT_CLIENT."
+        )
+
+
+def when_ready(server):
+    # Runs in the master after preload and before the first fork.
+    from server.app import app, db, init_migrate, replicas
+
+    check_shared_state(app)
+    with app.app_context():
+        if migrate_on_start:
+            from flask_migrate import upgrade
+            init_migrate(app)
+            upgrade()
+        db.engine.dispose()
+    replicas.dispose(app)
+    server.log.info("Migrations applied; starting %d workers", workers)
+
+
+def post_fork(server, worker):
+    from server.app import app, db, replicas
+
+    # close=False leaves the parent's connections alone and just forgets
+    # them, so the child opens its own on first use.
+    with app.app_context():
+        db.engine.dispose(close=False)
+    replicas.dispose(app, close=False)
+
+
+def post_request(worker, req, environ, resp):
+    if max_worker_rss_mb and rss_mb() > max_worker_rss_mb:
+        worker.log.info("Worker %s over %.0f MB RSS; recycling", worker.pid, max_worker_rss_mb)
+        # Finishes in-flight requests, then exits; the master replaces it.
+        worker.alive = False
+
+
+def worker_exit(server, worker):
+    from server.app import app, group_commit, hash_pool
+
+    # Commits whatever writes are still queued before the worker goes.
+    group_commit.shutdown(app)
+    hash_pool.shutdown()
@@ -0,0 +1,113 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+import bcrypt
+from flask import current_app
+
+from server.instrumentation import timed
+
+
+class HashingUnavailable(Exception):
+    pass
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_cost(hashed):
+    # Modular crypt format: $2b$<cost>$<salt+digest>
+    return int(hashed.split("$")[2])
+
+
+class HashPool:
+    """Runs bcrypt in a bounded process pool so bursts of signups and logins
+    can't pin every request thread on CPU. Work beyond the configured queue
+    depth fails fast with HashingUnavailable."""
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("BCRYPT_LOG_ROUNDS", 12)
+        app.config.setdefault("HASH_POOL_WORKERS", 2)
+        app.config.setdefault("HASH_POOL_QUEUE_DEPTH", 16)
+        app.config.setdefault("HASH_POOL_TIMEOUT", 5.0)
+        app.extensions["hash_pool"] = self
+
+    def _ensure_pool(self, config):
+        # A forked server worker inherits the parent's executor object but
+        # none of its processes, so pools are per-pid.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            workers = config["HASH_POOL_WORKERS"]
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            self._slots = threading.BoundedSemaphore(workers + config["HASH_POOL_QUEUE_DEPTH"])
+            self._pid = os.getpid()
+
+    def _run(self, fn, *args):
+        with timed("bcrypt"):
+            return self._run_pooled(fn, *args)
+
+    def _run_pooled(self, fn, *args):
+        config = current_app.config
+        if not config["HASH_POOL_WORKERS"]:
+            return fn(*args)
+
+        self._ensure_pool(config)
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise HashingUnavailable("Password hashing is at capacity.")
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # The slot is held until the work actually finishes: a timed-out
+        # hash that is already running in a worker can't be cancelled, and
+        # releasing early would let timeouts queue unbounded work.
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=config["HASH_POOL_TIMEOUT"])
+        except TimeoutError:
+            future.cancel()
+            raise HashingUnavailable("Password hashing timed out.")
+
+    def generate_password_hash(self, password):
+        if not password:
+            raise ValueError("Password must be non-empty.")
+        rounds = current_app.config["BCRYPT_LOG_ROUNDS"]
+        return self._run(_hashpw, password.encode("utf-8"), rounds).decode("utf-8")
+
+    def check_password_hash(self, hashed, password):
+        if not hashed or not password:
+            return False
+        return self._run(_checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed):
+        return hash_cost(hashed) != current_app.config["BCRYPT_LOG_ROUNDS"]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+            self._pid = None
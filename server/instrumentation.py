@@ -0,0 +1,143 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+from flask import Response, g, has_request_context, request
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def timed(phase):
+    # Cheap no-op unless Metrics installed a per-request timings dict.
+    if has_request_context() and "timings" in g:
+        return _timer(phase)
+    return nullcontext()
+
+
+@contextmanager
+def _timer(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(phase, time.perf_counter() - start)
+
+
+def _record(phase, seconds):
+    entry = g.timings.get(phase)
+    if entry is None:
+        g.timings[phase] = [1, seconds]
+    else:
+        entry[0] += 1
+        entry[1] += seconds
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    """Per-endpoint request latency histograms plus SQL, bcrypt and
+    serialization time, exposed at /metrics and in a Server-Timing header.
+    Nothing is hooked in unless METRICS_ENABLED is set."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = defaultdict(Histogram)
+        self.phases = defaultdict(lambda: [0, 0.0])
+
+    def init_app(self, app, db, api):
+        app.config.setdefault("METRICS_ENABLED", False)
+        if not app.config["METRICS_ENABLED"]:
+            return
+
+        app.extensions["metrics"] = self
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.add_url_rule("/metrics", "metrics", self.render)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+        output_json = api.representations["application/json"]
+
+        def timed_output_json(data, code, headers=None):
+            with timed("serialize"):
+                return output_json(data, code, headers)
+
+        api.representations["application/json"] = timed_output_json
+
+    def _before_request(self):
+        g.timings = {}
+        g.request_start = time.perf_counter()
+
+    def _after_request(self, response):
+        start = g.pop("request_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unmatched"
+        timings = g.timings
+
+        with self._lock:
+            self.latency[endpoint].observe(elapsed)
+            for phase, (calls, seconds) in timings.items():
+                totals = self.phases[(endpoint, phase)]
+                totals[0] += calls
+                totals[1] += seconds
+
+        parts = [
+            f'{phase};dur={seconds * 1000:.2f};desc="{calls} calls"'
+            for phase, (calls, seconds) in timings.items()
+        ]
+        parts.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(parts)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = conn.info["query_start"].pop()
+        if has_request_context() and "timings" in g:
+            _record("db", time.perf_counter() - start)
+
+    def render(self):
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by endpoint.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        with self._lock:
+            for endpoint, hist in sorted(self.latency.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), hist.counts):
+                    cumulative += count
+                    lines.append(
+                        f'http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {hist.sum}')
+                lines.append(f'http_request_duration_seconds_count{{endpoint="{endpoint}"}} {hist.count}')
+
+            lines.append("# HELP app_phase_calls_total Calls per request phase (db statements, bcrypt, serialize).")
+            lines.append("# TYPE app_phase_calls_total counter")
+            for (endpoint, phase), (calls, _) in sorted(self.phases.items()):
+                lines.append(f'app_phase_calls_total{{endpoint="{endpoint}",phase="{phase}"}} {calls}')
+            lines.append("# HELP app_phase_seconds_total Time spent per request phase.")
+            lines.append("# TYPE app_phase_seconds_total counter")
+            for (endpoint, phase), (_, seconds) in sorted(self.phases.items()):
+                lines.append(f'app_phase_seconds_total{{endpoint="{endpoint}",phase="{phase}"}} {seconds}')
+
+        return Response("\n".join(lines) + "\n", mimetype="text/plain; version=0.0.4")
@@ -1,8 +1,25 @@
-from sqlalchemy.orm import validates
+from datetime import datetime, timezone
+
+from flask import has_app_context
+from sqlalchemy import DDL, event, inspect
+from sqlalchemy.orm import Session, object_session, validates
 from flask_sqlalchemy import SQLAlchemy
-from flask_bcrypt import generate_password_hash, check_password_hash
 
-from server.app import db, bcrypt
+from server.app import db, hash_pool, profile_cache
+
+def utcnow():
+    # Naive UTC, matching what SQLite's CURRENT_TIMESTAMP produces.
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def check_title(value):
+    if not value or value.strip() == "":
+        raise ValueError("Title must be present.")
+    return value
+
+def check_instructions(value):
+    if not value or len(value.strip()) < 50:
+        raise ValueError("Instructions must be at least 50 characters.")
+    return value
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -12,6 +29,11 @@ class User(db.Model):
     _password_hash = db.Column(db.String, nullable=False)
     image_url = db.Column(db.String, default="")
     bio = db.Column(db.String, default="")
+    # Maintained by triggers on recipes (RECIPE_COUNT_TRIGGERS); indexed for
+    # the top authors on /stats.
+    recipe_count = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+    # Unknown (NULL) for users created before signups were dated.
+    created_at = db.Column(db.DateTime, default=utcnow)
 
     recipes = db.relationship("Recipe", backref="user", cascade="all, delete-orphan")
 
@@ -21,10 +43,15 @@ class User(db.Model):
 
     @password_hash.setter
     def password_hash(self, password):
-        self._password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self._password_hash = hash_pool.generate_password_hash(password)
 
     def authenticate(self, password):
-        return bcrypt.check_password_hash(self._password_hash, password)
+        if not hash_pool.check_password_hash(self._password_hash, password):
+            return False
+        # Transparently move the stored hash to the configured cost.
+        if hash_pool.needs_rehash(self._password_hash):
+            self.password_hash = password
+        return True
 
     @validates("username")
     def validate_username(self, key, value):
@@ -37,24 +64,288 @@ class User(db.Model):
 
 class Recipe(db.Model):
     __tablename__ = 'recipes'
+    # Serves per-user listings as a range scan in id order, for keyset
+    # pagination; it also covers plain user_id lookups.
+    __table_args__ = (db.Index("ix_recipes_user_id_id", "user_id", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
-    title = db.Column(db.String, nullable=False)
+    title = db.Column(db.String, nullable=False, index=True)
     instructions = db.Column(db.String, nullable=False)
-    minutes_to_complete = db.Column(db.Integer)
+    minutes_to_complete = db.Column(db.Integer, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    updated_at = db.Column(db.DateTime, default=utcnow, onupdate=utcnow)
+    # Copy of the author's profile (AUTHOR_SNAPSHOT_TRIGGERS), so listings
+    # can embed the author without joining users.
+    author_username = db.Column(db.String)
+    author_image_url = db.Column(db.String)
+    author_bio = db.Column(db.String)
 
     @validates("title")
     def validate_title(self, key, value):
-        if not value or value.strip() == "":
-            raise ValueError("Title must be present.")
-        return value
+        return check_title(value)
 
     @validates("instructions")
     def validate_instructions(self, key, value):
-        if not value or len(value.strip()) < 50:
-            raise ValueError("Instructions must be at least 50 characters.")
-        return value
+        return check_instructions(value)
 
     def __repr__(self):
         return f"<Recipe {self.title}>"
+
+# Full-text index over recipe titles and instructions. It is an external
+# content FTS5 table, so it stores only the index, and triggers keep it in
+# sync for ORM and Core (bulk) writes alike.
+RECIPES_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5(
+        title, instructions, content='recipes', content_rowid='id', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_ai AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_ad AFTER DELETE ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_fts_au AFTER UPDATE OF title, instructions ON recipes BEGIN
+        INSERT INTO recipes_fts(recipes_fts, rowid, title, instructions)
+        VALUES ('delete', old.id, old.title, old.instructions);
+        INSERT INTO recipes_fts(rowid, title, instructions)
+        VALUES (new.id, new.title, new.instructions);
+    END""",
+]
+
+for statement in RECIPES_FTS_DDL:
+    event.listen(Recipe.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+event.listen(
+    Recipe.__table__, "before_drop",
+    DDL("DROP TABLE IF EXISTS recipes_fts").execute_if(dialect="sqlite")
+)
+
+class TableVersion(db.Model):
+    """Change counter per table, bumped by triggers on every write, so
+    listings can derive ETag/Last-Modified from one primary-key read."""
+    __tablename__ = 'table_versions'
+
+    name = db.Column(db.String, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def __repr__(self):
+        return f"<TableVersion {self.name} v{self.version}>"
+
+# Recipe listings embed author profiles, so user edits bump "recipes" too.
+BUMP_RECIPES_VERSION = """
+    UPDATE table_versions SET version = version + 1, changed_at = CURRENT_TIMESTAMP
+    WHERE name = 'recipes';
+"""
+RECIPES_VERSION_TRIGGERS = {
+    Recipe.__table__: [
+        f"CREATE TRIGGER IF NOT EXISTS recipes_version_ai AFTER INSERT ON recipes BEGIN {BUMP_RECIPES_VERSION} END",
+        f"CREATE TRIGGER IF NOT EXISTS recipes_version_au AFTER UPDATE ON recipes BEGIN {BUMP_RECIPES_VERSION} END",
+        f"CREATE TRIGGER IF NOT EXISTS recipes_version_ad AFTER DELETE ON recipes BEGIN {BUMP_RECIPES_VERSION} END",
+    ],
+    User.__table__: [
+        f"CREATE TRIGGER IF NOT EXISTS users_recipes_version_au AFTER UPDATE OF username, image_url, bio ON users "
+        f"BEGIN {BUMP_RECIPES_VERSION} END",
+    ],
+    TableVersion.__table__: [
+        "INSERT OR IGNORE INTO table_versions (name, version, changed_at) VALUES ('recipes', 0, CURRENT_TIMESTAMP)",
+    ],
+}
+
+for table, statements in RECIPES_VERSION_TRIGGERS.items():
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+# Per-user recipe counts kept in users.recipe_count, so listings can report
+# a total without counting rows.
+RECIPE_COUNT_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS recipes_count_ai AFTER INSERT ON recipes BEGIN
+        UPDATE users SET recipe_count = recipe_count + 1 WHERE id = new.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_count_ad AFTER DELETE ON recipes BEGIN
+        UPDATE users SET recipe_count = recipe_count - 1 WHERE id = old.user_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS recipes_count_au AFTER UPDATE OF user_id ON recipes
+    WHEN new.user_id IS NOT old.user_id BEGIN
+        UPDATE users SET recipe_count = recipe_count - 1 WHERE id = old.user_id;
+        UPDATE users SET recipe_count = recipe_count + 1 WHERE id = new.user_id;
+    END""",
+]
+
+for statement in RECIPE_COUNT_TRIGGERS:
+    event.listen(Recipe.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+# Author snapshots on recipes. Inserts that don't supply one (the ORM path,
+# seed-bulk, raw SQL) have it filled in from users; profile edits rewrite
+# the author's recipes in the same transaction. They are part of the schema
+# and run whatever RECIPE_AUTHOR_SNAPSHOT says, which only picks the read
+# path: that is the write cost of being able to flip it on at any time.
+AUTHOR_SNAPSHOT_FROM_USERS = """
+        UPDATE recipes SET (author_username, author_image_url, author_bio) =
+            (SELECT username, image_url, bio FROM users WHERE id = new.user_id)
+        WHERE id = new.id;
+"""
+AUTHOR_SNAPSHOT_TRIGGERS = {
+    Recipe.__table__: [
+        f"""CREATE TRIGGER IF NOT EXISTS recipes_author_ai AFTER INSERT ON recipes
+    WHEN new.author_username IS NULL BEGIN {AUTHOR_SNAPSHOT_FROM_USERS} END""",
+        f"""CREATE TRIGGER IF NOT EXISTS recipes_author_au AFTER UPDATE OF user_id ON recipes
+    WHEN new.user_id IS NOT old.user_id BEGIN {AUTHOR_SNAPSHOT_FROM_USERS} END""",
+    ],
+    User.__table__: [
+        """CREATE TRIGGER IF NOT EXISTS users_author_au AFTER UPDATE OF username, image_url, bio ON users BEGIN
+        UPDATE recipes SET author_username = new.username, author_image_url = new.image_url, author_bio = new.bio
+        WHERE user_id = new.id;
+    END""",
+    ],
+}
+
+for table, statements in AUTHOR_SNAPSHOT_TRIGGERS.items():
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+class StatCounter(db.Model):
+    """Running totals for /stats, kept by STATS_TRIGGERS."""
+    __tablename__ = 'stat_counters'
+
+    name = db.Column(db.String, primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<StatCounter {self.name}={self.value}>"
+
+class MinutesBucket(db.Model):
+    """Histogram of recipes.minutes_to_complete; see MINUTES_BUCKET_TIERS."""
+    __tablename__ = 'recipe_minutes_buckets'
+
+    bucket = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MinutesBucket {self.bucket}: {self.count}>"
+
+class SignupDay(db.Model):
+    __tablename__ = 'signup_days'
+
+    day = db.Column(db.String, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SignupDay {self.day}: {self.count}>"
+
+STAT_COUNTERS = ("users", "recipes", "timed_recipes", "minutes_sum")
+
+# Histogram buckets as (upper bound, width) tiers: exact below an hour, then
+# progressively wider, so a bucket is never more than ~8% of its value wide.
+# A bucket is keyed by its lower bound.
+MINUTES_BUCKET_TIERS = ((60, 1), (240, 5), (1440, 30), (None, 240))
+
+def minutes_bucket_sql(expr):
+    cases = []
+    lower = None
+    for upper, width in MINUTES_BUCKET_TIERS:
+        value = expr if lower is None else f"{lower} + ({expr} - {lower}) / {width} * {width}"
+        cases.append(f"WHEN {expr} < {upper} THEN {value}" if upper is not None else f"ELSE {value}")
+        lower = upper
+    return f"CASE {' '.join(cases)} END"
+
+def _recipe_stats(row, sign):
+    op = "+" if sign > 0 else "-"
+    minutes = f"{row}.minutes_to_complete"
+    bucket = minutes_bucket_sql(minutes)
+    if sign > 0:
+        histogram = f"""INSERT INTO recipe_minutes_buckets (bucket, count) SELECT {bucket}, 1
+        WHERE {minutes} IS NOT NULL
+        ON CONFLICT (bucket) DO UPDATE SET count = count + 1;"""
+    else:
+        histogram = f"""UPDATE recipe_minutes_buckets SET count = count - 1
+        WHERE {minutes} IS NOT NULL AND bucket = {bucket};"""
+    return f"""
+        UPDATE stat_counters SET value = value {op} CASE name
+            WHEN 'recipes' THEN 1
+            WHEN 'timed_recipes' THEN {minutes} IS NOT NULL
+            ELSE coalesce({minutes}, 0) END
+        WHERE name IN ('recipes', 'timed_recipes', 'minutes_sum');
+        {histogram}
+    """
+
+# Summary tables behind /stats, updated in the writing transaction for ORM,
+# Core and raw SQL writes alike; `flask rebuild-stats` recomputes them.
+STATS_TRIGGERS = {
+    Recipe.__table__: [
+        f"""CREATE TRIGGER IF NOT EXISTS stats_recipes_ai AFTER INSERT ON recipes BEGIN
+        {_recipe_stats("new", 1)}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS stats_recipes_ad AFTER DELETE ON recipes BEGIN
+        {_recipe_stats("old", -1)}
+    END""",
+        f"""CREATE TRIGGER IF NOT EXISTS stats_recipes_au AFTER UPDATE OF minutes_to_complete ON recipes
+    WHEN new.minutes_to_complete IS NOT old.minutes_to_complete BEGIN
+        {_recipe_stats("old", -1)}
+        {_recipe_stats("new", 1)}
+    END""",
+    ],
+    User.__table__: [
+        """CREATE TRIGGER IF NOT EXISTS stats_users_ai AFTER INSERT ON users BEGIN
+        UPDATE users SET created_at = CURRENT_TIMESTAMP WHERE id = new.id AND new.created_at IS NULL;
+        UPDATE stat_counters SET value = value + 1 WHERE name = 'users';
+        INSERT INTO signup_days (day, count) SELECT date(coalesce(new.created_at, CURRENT_TIMESTAMP)), 1
+        WHERE true
+        ON CONFLICT (day) DO UPDATE SET count = count + 1;
+    END""",
+        """CREATE TRIGGER IF NOT EXISTS stats_users_ad AFTER DELETE ON users BEGIN
+        UPDATE stat_counters SET value = value - 1 WHERE name = 'users';
+        UPDATE signup_days SET count = count - 1 WHERE day = date(old.created_at);
+    END""",
+    ],
+    StatCounter.__table__: [
+        "INSERT OR IGNORE INTO stat_counters (name, value) VALUES "
+        + ", ".join(f"('{name}', 0)" for name in STAT_COUNTERS),
+    ],
+}
+
+for table, statements in STATS_TRIGGERS.items():
+    for statement in statements:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+class SessionRecord(db.Model):
+    __tablename__ = 'sessions'
+    __table_args__ = {"sqlite_with_rowid": False}
+
+    key = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, index=True)
+    data = db.Column(db.Text, nullable=False)
+    expires_at = db.Column(db.Integer, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SessionRecord {self.key[:8]} user={self.user_id}>"
+
+# Cached profiles are invalidated only once the change is committed, so a
+# concurrent reader can never re-cache the pre-commit row under the new version.
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def queue_profile_invalidation(mapper, connection, target):
+    object_session(target).info.setdefault("changed_profiles", set()).add(target.id)
+
+@event.listens_for(Session, "do_orm_execute")
+def queue_bulk_profile_invalidation(orm_execute_state):
+    if (orm_execute_state.is_update or orm_execute_state.is_delete) \
+            and orm_execute_state.bind_mapper is inspect(User):
+        orm_execute_state.session.info["profiles_bulk_changed"] = True
+
+@event.listens_for(Session, "after_commit")
+def invalidate_profiles(session):
+    # Each app keeps its own profile cache; with no app there is none.
+    if not has_app_context():
+        discard_profile_invalidations(session)
+        return
+    if session.info.pop("profiles_bulk_changed", False):
+        profile_cache.invalidate_all()
+    for user_id in session.info.pop("changed_profiles", ()):
+        profile_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def discard_profile_invalidations(session):
+    session.info.pop("profiles_bulk_changed", None)
+    session.info.pop("changed_profiles", None)
@@ -0,0 +1,86 @@
+import base64
+import binascii
+import json
+import math
+
+# SQLite integers are signed 64-bit; anything wider overflows the driver.
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+
+def is_int64(value):
+    return isinstance(value, int) and not isinstance(value, bool) and INT64_MIN <= value <= INT64_MAX
+
+
+def encode_cursor(last_id, **extra):
+    payload = json.dumps({"id": last_id, **extra}, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_cursor_payload(token):
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, ValueError, UnicodeError):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(payload, dict) or not is_int64(payload.get("id")):
+        raise ValueError("Invalid cursor.")
+    return payload
+
+
+def cursor_score(payload):
+    """The finite float a search cursor resumes after."""
+    score = payload.get("score")
+    if isinstance(score, bool) or not isinstance(score, (int, float)):
+        raise ValueError("Invalid cursor.")
+    try:
+        score = float(score)
+    except OverflowError:
+        raise ValueError("Invalid cursor.")
+    if not math.isfinite(score):
+        raise ValueError("Invalid cursor.")
+    return score
+
+
+def decode_cursor(token):
+    return decode_cursor_payload(token)["id"]
+
+
+def parse_limit(value, default, maximum):
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("Limit must be an integer.")
+    if limit < 1:
+        raise ValueError("Limit must be at least 1.")
+    return min(limit, maximum)
+
+
+def parse_int(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer.")
+    if not is_int64(number):
+        raise ValueError(f"{name} is out of range.")
+    return number
+
+
+def prefix_upper_bound(prefix):
+    # Smallest string greater than every string starting with prefix, so a
+    # prefix match becomes an index range scan: prefix <= col < upper.
+    # Trailing U+10FFFF can't be incremented, so it is dropped and the
+    # character before it bumped instead; None means there is no bound.
+    stripped = prefix.rstrip("\U0010ffff")
+    if not stripped:
+        return None
+    code = ord(stripped[-1]) + 1
+    if 0xD800 <= code <= 0xDFFF:
+        # Surrogates can't be encoded; the next character is U+E000.
+        code = 0xE000
+    return stripped[:-1] + chr(code)
@@ -0,0 +1,108 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+def sliding_count(previous, current, elapsed_fraction):
+    # Sliding-window counter: the previous fixed window is weighted by how
+    # much of it still overlaps a window ending now.
+    return previous * (1 - elapsed_fraction) + current
+
+
+class MemoryRateLimitStore:
+    """Per-process counters: two integers per key, in an LRU capped at
+    max_keys so a flood of distinct keys can't grow memory without bound.
+    An evicted key simply starts counting again."""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window_index):
+        """Count a hit in window_index; return (previous, current) counts."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < window_index - 1:
+                previous, current = 0, 1
+            elif entry[0] == window_index - 1:
+                previous, current = entry[2], 1
+            else:
+                previous, current = entry[1], entry[2] + 1
+            self._entries[key] = (window_index, previous, current)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            return previous, current
+
+
+class SharedRateLimitStore:
+    """Counters in a Redis-style client (incr / expire / get), one key per
+    fixed window, so every worker and host shares the same limits. Keys
+    expire after two windows, which bounds the client's memory too."""
+
+    def __init__(self, client, window, prefix="ratelimit:"):
+        self.client = client
+        self.window = window
+        self.prefix = prefix
+
+    def hit(self, key, window_index):
+        current = self.client.incr(f"{self.prefix}{key}:{window_index}")
+        if current == 1:
+            self.client.expire(f"{self.prefix}{key}:{window_index}", 2 * self.window)
+        raw = self.client.get(f"{self.prefix}{key}:{window_index - 1}")
+        return (0 if raw is None else int(raw)), current
+
+
+class RateLimiter:
+    """Sliding-window limits keyed by rule and identity (client IP,
+    username). Each check costs one counter update per key and nothing
+    else, so callers can reject before any database or bcrypt work."""
+
+    def init_app(self, app):
+        app.config.setdefault("RATE_LIMIT_ENABLED", True)
+        app.config.setdefault("RATE_LIMIT_BACKEND", "memory")
+        app.config.setdefault("RATE_LIMIT_CLIENT", None)
+        app.config.setdefault("RATE_LIMIT_WINDOW", 60)
+        app.config.setdefault("RATE_LIMIT_MAX_KEYS", 100000)
+        app.config.setdefault("RATE_LIMITS", {})
+
+        if app.config["RATE_LIMIT_BACKEND"] == "shared":
+            client = app.config["RATE_LIMIT_CLIENT"]
+            if client is None:
+                # A per-process stand-in would give each worker its own
+                # counters and multiply every limit by the worker count.
+                raise RuntimeError("RATE_LIMIT_BACKEND 'shared' needs RATE_LIMIT_CLIENT.")
+            store = SharedRateLimitStore(client, app.config["RATE_LIMIT_WINDOW"])
+        else:
+            store = MemoryRateLimitStore(app.config["RATE_LIMIT_MAX_KEYS"])
+        app.extensions["rate_limiter"] = store
+
+    def check(self, *keys, now=None):
+        """Count a hit for each (rule, identity) pair. Returns the number of
+        seconds to wait if any limit is exceeded, else None."""
+        config = current_app.config
+        if not config["RATE_LIMIT_ENABLED"]:
+            return None
+
+        store = current_app.extensions["rate_limiter"]
+        window = config["RATE_LIMIT_WINDOW"]
+        now = time.time() if now is None else now
+        window_index, offset = divmod(now, window)
+        elapsed = offset / window
+
+        exceeded = False
+        for rule, identity in keys:
+            limit = config["RATE_LIMITS"].get(rule)
+            if not limit or not identity:
+                continue
+            # Identities are client-supplied; cap their size in the store.
+            previous, current = store.hit(f"{rule}:{str(identity)[:128]}", int(window_index))
+            if sliding_count(previous, current, elapsed) > limit:
+                exceeded = True
+        if exceeded:
+            return max(1, math.ceil(window - offset))
+        return None
@@ -0,0 +1,93 @@
+import itertools
+import time
+from functools import wraps
+
+from flask import current_app, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+
+from server.database import engine_options, install_sqlite_pragmas
+
+
+class RoutingSession(Session):
+    """Sends queries to the replica engine picked for the request, if any.
+    Flushes always go to the primary."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        replica = self.info.get("replica")
+        if replica is not None and bind is None and not self._flushing:
+            return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class Replicas:
+    """Read replicas from SQLALCHEMY_REPLICA_URIS, used round-robin by
+    handlers wrapped in replica_reads.
+
+    After a user's own successful write, their session is pinned to the
+    primary for REPLICA_STICKY_SECONDS so they read what they just wrote
+    even while the replicas lag."""
+
+    def init_app(self, app, db):
+        app.config.setdefault("SQLALCHEMY_REPLICA_URIS", [])
+        app.config.setdefault("REPLICA_STICKY_SECONDS", 5)
+
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})
+        engines = []
+        for uri in app.config["SQLALCHEMY_REPLICA_URIS"]:
+            engine = create_engine(uri, **engine_options(uri, options))
+            install_sqlite_pragmas(engine, app.config.get("SQLITE_PRAGMAS"))
+            engines.append(engine)
+        app.extensions["replicas"] = {"engines": engines, "next": itertools.cycle(engines)}
+        if engines:
+            app.after_request(self._pin_after_write)
+        self.db = db
+
+    def engines(self, app=None):
+        return (app or current_app).extensions["replicas"]["engines"]
+
+    def dispose(self, app, close=True):
+        for engine in self.engines(app):
+            engine.dispose(close=close)
+
+    def _pin_after_write(self, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            if session.get("user_id"):
+                session["primary_until"] = time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+        return response
+
+    def choose(self):
+        state = current_app.extensions["replicas"]
+        if not state["engines"] or session.get("primary_until", 0) > time.time():
+            return None
+        return next(state["next"])
+
+    def sync(self, app=None):
+        """Copy the primary into every replica with SQLite's backup API.
+        Stands in for real replication when running locally and in tests."""
+        app = app or current_app
+        with app.app_context():
+            primary = self.db.engine.raw_connection()
+            try:
+                for engine in self.engines(app):
+                    replica = engine.raw_connection()
+                    try:
+                        primary.driver_connection.backup(replica.driver_connection)
+                    finally:
+                        replica.close()
+            finally:
+                primary.close()
+
+
+def replica_reads(fn):
+    """Route the wrapped handler's queries to a replica unless the user is
+    pinned to the primary."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        from server.app import db, replicas
+
+        replica = replicas.choose()
+        if replica is not None:
+            db.session.info["replica"] = replica
+        return fn(*args, **kwargs)
+    return wrapper
@@ -1,17 +1,126 @@
-from flask import request, session, jsonify
+import hashlib
+import json
+import re
+from urllib.parse import urlencode
+
+from flask import request, session, jsonify, current_app, Response, stream_with_context
+from werkzeug.http import http_date, parse_date, parse_etags
 from flask_restful import Resource
-from server.models import db, User, Recipe
+from sqlalchemy import delete, insert, select, text, update
+from server.app import group_commit, profile_cache, rate_limiter
+from server.models import db, User, Recipe, TableVersion, check_title, check_instructions
+from server.groupcommit import WriteUnavailable
+from server.hashing import HashingUnavailable
+from server.replicas import replica_reads
+from server.pagination import (
+    encode_cursor, decode_cursor, decode_cursor_payload, cursor_score, parse_limit, parse_int,
+    prefix_upper_bound, is_int64
+)
+from server.serializers import RecipeSchema, recipe_schema, user_schema, dumps
+from server.signals import recipe_changed
+from server.stats import stats_summary
+
+def listing_etag(table, version, args):
+    query = urlencode(sorted(args.items(multi=True)))
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+    return f"{table}-{version}-{digest}"
+
+def listing_validators(table, args):
+    """Strong ETag and Last-Modified for a listing, from the table's change
+    counter and the request's query string -- no rows are read."""
+    version, changed_at = db.session.execute(
+        select(TableVersion.version, TableVersion.changed_at).where(TableVersion.name == table)
+    ).one()
+    return listing_etag(table, version, args), changed_at
 
-def user_to_dict(user):
+def validator_headers(etag, last_modified):
     return {
-        "id": user.id,
-        "username": user.username,
-        "image_url": user.image_url,
-        "bio": user.bio
+        "ETag": f'"{etag}"',
+        "Last-Modified": http_date(last_modified),
+        "Cache-Control": "private, no-cache",
     }
 
+def not_modified(etag, last_modified, headers):
+    if_none_match = parse_etags(headers.get("If-None-Match"))
+    if if_none_match:
+        # Weak comparison: a compressed response carries W/"<etag>".
+        return if_none_match.contains_weak(etag)
+    since = parse_date(headers.get("If-Modified-Since"))
+    return since is not None and since.replace(tzinfo=None) >= last_modified.replace(microsecond=0)
+
+def recipe_statement(schema):
+    # RECIPE_AUTHOR_SNAPSHOT reads authors from recipes.author_* and skips
+    # the join; turn it on once repair-author-snapshots has run.
+    return schema.statement(Recipe.id, snapshot=current_app.config["RECIPE_AUTHOR_SNAPSHOT"])
+
+def recipe_listing(args, author_id=None):
+    """Build the GET /recipes row query from its query string, optionally
+    scoped to one author regardless of ?user_id=.
+
+    Returns (statement, limit, schema); raises ValueError for bad input.
+    Rows go straight from the cursor into dicts; the leading id is always
+    selected for the cursor even when ?fields= leaves it out."""
+    limit = parse_limit(
+        args.get("limit"),
+        current_app.config["RECIPES_PAGE_SIZE"],
+        current_app.config["RECIPES_MAX_PAGE_SIZE"]
+    )
+    cursor = args.get("cursor")
+    after_id = decode_cursor(cursor) if cursor else None
+    if author_id is None:
+        author_id = parse_int(args, "user_id")
+    min_minutes = parse_int(args, "min_minutes")
+    max_minutes = parse_int(args, "max_minutes")
+    schema = RecipeSchema.from_request(args)
+
+    stmt = recipe_statement(schema)
+    if after_id is not None:
+        stmt = stmt.where(Recipe.id > after_id)
+    if author_id is not None:
+        stmt = stmt.where(Recipe.user_id == author_id)
+    if min_minutes is not None:
+        stmt = stmt.where(Recipe.minutes_to_complete >= min_minutes)
+    if max_minutes is not None:
+        stmt = stmt.where(Recipe.minutes_to_complete <= max_minutes)
+    title_prefix = args.get("title_prefix")
+    if title_prefix:
+        stmt = stmt.where(Recipe.title >= title_prefix)
+        upper = prefix_upper_bound(title_prefix)
+        if upper is not None:
+            stmt = stmt.where(Recipe.title < upper)
+    return stmt.order_by(Recipe.id).limit(limit + 1), limit, schema
+
+def paginate(rows, limit, args, base_url, headers, cursor_for=lambda row: encode_cursor(row[0])):
+    """Trim the extra row fetched past ``limit`` and, if there was one, add
+    X-Next-Cursor and Link headers for the next page."""
+    if len(rows) <= limit:
+        return rows
+    rows = rows[:limit]
+    next_cursor = cursor_for(rows[-1])
+    headers["X-Next-Cursor"] = next_cursor
+    next_args = args.to_dict()
+    next_args["cursor"] = next_cursor
+    headers["Link"] = f'<{base_url}?{urlencode(next_args)}>; rel="next"'
+    return rows
+
+def insert_and_dump(db_session, obj, schema):
+    """Group-commit job for a single new row: validation has already run
+    in the request thread, so this only adds, flushes for the id and
+    serializes -- before commit, so expiry doesn't reload the row and its
+    relationships one attribute access at a time."""
+    db_session.add(obj)
+    db_session.flush()
+    return schema.dump(obj)
+
+def too_many_attempts(retry_after):
+    return {"error": "Too many attempts. Try again later."}, 429, {"Retry-After": str(retry_after)}
+
 class Signup(Resource):
     def post(self):
+        retry_after = rate_limiter.check(("signup_ip", request.remote_addr))
+        if retry_after:
+            return too_many_attempts(retry_after)
+
         data = request.get_json()
 
         try:
@@ -21,13 +130,14 @@ class Signup(Resource):
                 bio=data.get("bio", "")
             )
             user.password_hash = data["password"]  # uses @password_hash.setter
-            db.session.add(user)
-            db.session.commit()
+            body = group_commit.run(lambda db_session: insert_and_dump(db_session, user, user_schema))
 
-            session["user_id"] = user.id
+            session["user_id"] = body["id"]
 
-            return user_to_dict(user), 201
+            return body, 201
 
+        except (HashingUnavailable, WriteUnavailable) as e:
+            return {"error": str(e)}, 503, {"Retry-After": "1"}
         except Exception as e:
             return {"errors": [str(e)]}, 422
 
@@ -35,11 +145,24 @@ class Signup(Resource):
 class Login(Resource):
     def post(self):
         data = request.get_json()
+        retry_after = rate_limiter.check(
+            ("login_ip", request.remote_addr),
+            ("login_user", data.get("username")),
+        )
+        if retry_after:
+            return too_many_attempts(retry_after)
         user = User.query.filter_by(username=data.get("username")).first()
 
-        if user and user.authenticate(data.get("password")):
+        try:
+            authenticated = user and user.authenticate(data.get("password"))
+        except HashingUnavailable as e:
+            return {"error": str(e)}, 503, {"Retry-After": "1"}
+
+        if authenticated:
+            if db.session.is_modified(user):
+                db.session.commit()
             session["user_id"] = user.id
-            return user_to_dict(user), 200
+            return user_schema.dump(user), 200
 
         return {"error": "Invalid username or password"}, 401
 
@@ -48,38 +171,90 @@ class Logout(Resource):
     def delete(self):
         user_id = session.get("user_id")
         if user_id:
-            session.pop("user_id", None)
+            # Emptying the session deletes its server-side record.
+            session.clear()
             return "", 204
         return {"error": "Unauthorized"}, 401
 
 
+class SessionList(Resource):
+    def get(self):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+
+        backend = current_app.session_interface.backend
+        return [
+            {"id": key, "expires_at": expires_at, "current": key == session.key}
+            for key, expires_at in backend.list_for_user(user_id)
+        ], 200
+
+    def delete(self):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+
+        backend = current_app.session_interface.backend
+        backend.revoke_all(user_id, keep=session.key)
+        return "", 204
+
+
+class SessionDetail(Resource):
+    def delete(self, key):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+
+        backend = current_app.session_interface.backend
+        if not backend.revoke(user_id, key):
+            return {"error": "Session not found"}, 404
+        if key == session.key:
+            session.clear()
+        return "", 204
+
+
 class CheckSession(Resource):
+    method_decorators = {"get": [replica_reads]}
+
     def get(self):
         user_id = session.get("user_id")
         if user_id:
+            profile, key = profile_cache.lookup(user_id)
+            if profile is not None:
+                return profile, 200
             user = db.session.get(User, user_id)  # ✅ SQLAlchemy 2.0+ fix
             if user:
-                return user_to_dict(user), 200
+                profile = user_schema.dump(user)
+                # A lagging replica can return the row from before the write
+                # that moved the cache version on; only the primary may fill it.
+                if db.session.info.get("replica") is None:
+                    profile_cache.store(key, profile)
+                return profile, 200
         return {"error": "Unauthorized"}, 401
 
 
 class RecipeIndex(Resource):
+    method_decorators = {"get": [replica_reads]}
+
     def get(self):
         user_id = session.get("user_id")
         if not user_id:
             return {"error": "Unauthorized"}, 401
 
-        recipes = Recipe.query.all()
-        return [
-            {
-                "id": r.id,
-                "title": r.title,
-                "instructions": r.instructions,
-                "minutes_to_complete": r.minutes_to_complete,
-                "user": user_to_dict(r.user)
-            }
-            for r in recipes
-        ], 200
+        args = request.args
+        try:
+            stmt, limit, schema = recipe_listing(args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        etag, last_modified = listing_validators("recipes", args)
+        headers = validator_headers(etag, last_modified)
+        if not_modified(etag, last_modified, request.headers):
+            return Response(status=304, headers=headers)
+
+        rows = db.session.execute(stmt).all()
+        rows = paginate(rows, limit, args, request.base_url, headers)
+        return [schema.dump_row(row, 1) for row in rows], 200, headers
 
     def post(self):
         user_id = session.get("user_id")
@@ -92,19 +267,365 @@ class RecipeIndex(Resource):
             recipe = Recipe(
                 title=data["title"],
                 instructions=data["instructions"],
-                minutes_to_complete=data["minutes_to_complete"],
+                minutes_to_complete=check_minutes(data["minutes_to_complete"]),
                 user_id=user_id
             )
-            db.session.add(recipe)
-            db.session.commit()
+            body = group_commit.run(lambda db_session: insert_and_dump(db_session, recipe, recipe_schema))
+            recipe_changed.send(
+                current_app._get_current_object(), action="created",
+                recipe_id=body["id"], user_id=user_id, fields=RECIPE_FIELDS
+            )
 
-            return {
-                "id": recipe.id,
-                "title": recipe.title,
-                "instructions": recipe.instructions,
-                "minutes_to_complete": recipe.minutes_to_complete,
-                "user": user_to_dict(recipe.user)
-            }, 201
+            return body, 201
 
+        except WriteUnavailable as e:
+            return {"error": str(e)}, 503, {"Retry-After": "1"}
         except Exception as e:
             return {"errors": [str(e)]}, 422
+
+
+class RecipeDetail(Resource):
+    # Ownership is part of the WHERE clause, so each write is one statement
+    # with no read first. A recipe that is missing and one that belongs to
+    # someone else both get a 404.
+
+    def patch(self, recipe_id):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+        if not is_int64(recipe_id):
+            # <int:> takes any width; no row id is wider than 64 bits.
+            return {"error": "Recipe not found"}, 404
+
+        changes, errors = validate_recipe_changes(request.get_json(silent=True))
+        if errors:
+            return {"errors": errors}, 422
+        if not changes:
+            return {"error": "No fields to update."}, 400
+
+        def job(db_session):
+            result = db_session.execute(
+                update(Recipe)
+                .where(Recipe.id == recipe_id, Recipe.user_id == user_id)
+                .values(**changes)
+                .execution_options(synchronize_session=False)
+            )
+            if not result.rowcount:
+                return None
+            row = db_session.execute(recipe_schema.statement(Recipe.id).where(Recipe.id == recipe_id)).one()
+            return recipe_schema.dump_row(row, 1)
+
+        try:
+            body = group_commit.run(job)
+        except WriteUnavailable as e:
+            return {"error": str(e)}, 503, {"Retry-After": "1"}
+        if body is None:
+            return {"error": "Recipe not found"}, 404
+
+        recipe_changed.send(
+            current_app._get_current_object(), action="updated",
+            recipe_id=recipe_id, user_id=user_id, fields=tuple(changes)
+        )
+        return body, 200
+
+    def delete(self, recipe_id):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+        if not is_int64(recipe_id):
+            return {"error": "Recipe not found"}, 404
+
+        def job(db_session):
+            return db_session.execute(
+                delete(Recipe)
+                .where(Recipe.id == recipe_id, Recipe.user_id == user_id)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+
+        try:
+            deleted = group_commit.run(job)
+        except WriteUnavailable as e:
+            return {"error": str(e)}, 503, {"Retry-After": "1"}
+        if not deleted:
+            return {"error": "Recipe not found"}, 404
+
+        recipe_changed.send(
+            current_app._get_current_object(), action="deleted",
+            recipe_id=recipe_id, user_id=user_id, fields=RECIPE_FIELDS
+        )
+        return "", 204
+
+
+class UserRecipeIndex(Resource):
+    method_decorators = {"get": [replica_reads]}
+
+    def get(self, user_id):
+        if not session.get("user_id"):
+            return {"error": "Unauthorized"}, 401
+        return self.listing(user_id)
+
+    def listing(self, author_id):
+        if not is_int64(author_id):
+            return {"error": "User not found"}, 404
+        args = request.args
+        try:
+            stmt, limit, schema = recipe_listing(args, author_id=author_id)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        # The count comes from users.recipe_count, and the rows from a range
+        # scan of (user_id, id), so neither grows with other users' recipes.
+        # It is the author's total, whatever filters or cursor narrow the
+        # page, hence the header name.
+        count = db.session.execute(
+            select(User.recipe_count).where(User.id == author_id)
+        ).scalar_one_or_none()
+        if count is None:
+            return {"error": "User not found"}, 404
+
+        headers = {"X-Author-Recipe-Count": str(count)}
+        rows = db.session.execute(stmt).all()
+        rows = paginate(rows, limit, args, request.base_url, headers)
+        return [schema.dump_row(row, 1) for row in rows], 200, headers
+
+
+class MyRecipeIndex(UserRecipeIndex):
+    def get(self):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+        return self.listing(user_id)
+
+
+class Stats(Resource):
+    method_decorators = {"get": [replica_reads]}
+
+    def get(self):
+        if not session.get("user_id"):
+            return {"error": "Unauthorized"}, 401
+
+        try:
+            days = parse_int(request.args, "days")
+            if days is not None and days < 1:
+                raise ValueError("days must be at least 1.")
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        # Every figure comes from the summary tables or an index, never a
+        # scan of recipes or users.
+        config = current_app.config
+        days = min(days or config["STATS_SIGNUP_DAYS"], config["STATS_MAX_SIGNUP_DAYS"])
+        return stats_summary(days, config["STATS_TOP_AUTHORS"]), 200
+
+
+def parse_ndjson_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+RECIPE_FIELDS = ("title", "instructions", "minutes_to_complete")
+
+def check_minutes(value):
+    if value is None:
+        return value
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError("Minutes to complete must be an integer.")
+    if value < 0:
+        raise ValueError("Minutes to complete can't be negative.")
+    if not is_int64(value):
+        raise ValueError("Minutes to complete is too large.")
+    return value
+
+def validate_recipe_changes(data):
+    """Validate only the fields a PATCH supplies. Returns (changes, errors)."""
+    if not isinstance(data, dict):
+        return None, ["Body must be a JSON object."]
+    unknown = set(data) - set(RECIPE_FIELDS)
+    if unknown:
+        return None, [f"Unknown fields: {', '.join(sorted(unknown))}."]
+
+    errors = []
+    checks = {"title": check_title, "instructions": check_instructions, "minutes_to_complete": check_minutes}
+    for field in RECIPE_FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        if field != "minutes_to_complete" and not isinstance(value, str):
+            value = None
+        try:
+            checks[field](value)
+        except ValueError as e:
+            errors.append(str(e))
+    return (None, errors) if errors else (data, None)
+
+def validate_recipe_row(row, user_id):
+    if not isinstance(row, dict):
+        return None, ["Each recipe must be a JSON object."]
+
+    errors = []
+    for check, field in ((check_title, "title"), (check_instructions, "instructions")):
+        value = row.get(field)
+        try:
+            check(value if isinstance(value, str) else None)
+        except ValueError as e:
+            errors.append(str(e))
+    minutes = row.get("minutes_to_complete")
+    try:
+        check_minutes(minutes)
+    except ValueError as e:
+        errors.append(str(e))
+    if errors:
+        return None, errors
+
+    return {
+        "title": row["title"],
+        "instructions": row["instructions"],
+        "minutes_to_complete": minutes,
+        "user_id": user_id
+    }, None
+
+
+class RecipeBulk(Resource):
+    def post(self):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+
+        max_rows = current_app.config["RECIPES_BULK_MAX_ROWS"]
+        if request.mimetype == "application/x-ndjson":
+            rows = [parse_ndjson_line(line) for line in request.stream if line.strip()]
+        else:
+            rows = request.get_json(silent=True)
+        if not isinstance(rows, list):
+            return {"error": "Body must be a JSON array or NDJSON."}, 400
+        if len(rows) > max_rows:
+            return {"error": f"At most {max_rows} recipes per request."}, 413
+
+        # Validate everything up front so the insert loop only ever sees
+        # clean rows and can hand whole chunks to executemany.
+        valid = []
+        errors = []
+        for index, row in enumerate(rows):
+            values, row_errors = validate_recipe_row(row, user_id)
+            if row_errors:
+                errors.append({"index": index, "errors": row_errors})
+            else:
+                valid.append(values)
+
+        if not valid:
+            return {"inserted": 0, "errors": errors}, 422
+
+        chunk_size = current_app.config["RECIPES_BULK_CHUNK_SIZE"]
+        for start in range(0, len(valid), chunk_size):
+            db.session.execute(insert(Recipe), valid[start:start + chunk_size])
+        db.session.commit()
+        recipe_changed.send(
+            current_app._get_current_object(), action="bulk_created",
+            recipe_id=None, user_id=user_id, fields=RECIPE_FIELDS
+        )
+
+        return {"inserted": len(valid), "errors": errors}, 201
+
+
+def fts_query(q):
+    # Quote every term so FTS5 operators in user input are treated as text;
+    # the last term is a prefix match so results follow the user's typing.
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+SEARCH_SQL = """
+    SELECT rowid AS id, bm25(recipes_fts, 10.0, 1.0) AS score
+    FROM recipes_fts
+    WHERE recipes_fts MATCH :query {after}
+    ORDER BY score, id
+    LIMIT :limit
+"""
+
+class RecipeSearch(Resource):
+    def get(self):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+
+        args = request.args
+        query = fts_query(args.get("q", ""))
+        if query is None:
+            return {"error": "Search query must contain a word."}, 400
+        try:
+            limit = parse_limit(
+                args.get("limit"),
+                current_app.config["RECIPES_PAGE_SIZE"],
+                current_app.config["RECIPES_MAX_PAGE_SIZE"]
+            )
+            cursor = args.get("cursor")
+            after = decode_cursor_payload(cursor) if cursor else None
+            score = cursor_score(after) if after is not None else None
+            schema = RecipeSchema.from_request(args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        # Keyset pagination on (bm25 score, id): lower scores rank higher.
+        params = {"query": query, "limit": limit + 1}
+        after_sql = ""
+        if after is not None:
+            after_sql = "AND (score > :score OR (score = :score AND id > :after_id))"
+            params.update(score=score, after_id=after["id"])
+        hits = db.session.execute(text(SEARCH_SQL.format(after=after_sql)), params).all()
+
+        headers = {}
+        hits = paginate(
+            hits, limit, args, request.base_url, headers,
+            cursor_for=lambda hit: encode_cursor(hit.id, score=hit.score)
+        )
+
+        ids = [hit.id for hit in hits]
+        by_id = {
+            row[0]: schema.dump_row(row, 1)
+            for row in db.session.execute(recipe_statement(schema).where(Recipe.id.in_(ids)))
+        }
+        return [by_id[i] for i in ids if i in by_id], 200, headers
+
+class RecipeExport(Resource):
+    def get(self):
+        user_id = session.get("user_id")
+        if not user_id:
+            return {"error": "Unauthorized"}, 401
+
+        try:
+            schema = RecipeSchema.from_request(request.args)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        ndjson = request.accept_mimetypes.best_match(
+            ["application/json", "application/x-ndjson"]
+        ) == "application/x-ndjson"
+        batch_size = current_app.config["RECIPES_EXPORT_BATCH_SIZE"]
+
+        # Plain row tuples streamed in batches keep memory flat no matter how
+        # many recipes are exported.
+        stmt = recipe_statement(schema).order_by(Recipe.id).execution_options(yield_per=batch_size)
+
+        def generate():
+            result = db.session.execute(stmt)
+            first = True
+            if not ndjson:
+                yield "["
+            for rows in result.partitions():
+                chunk = []
+                for row in rows:
+                    line = dumps(schema.dump_row(row, 1))
+                    if ndjson:
+                        chunk.append(line + "\n")
+                    else:
+                        chunk.append(line if first else "," + line)
+                        first = False
+                yield "".join(chunk)
+            if not ndjson:
+                yield "]"
+
+        mimetype = "application/x-ndjson" if ndjson else "application/json"
+        return Response(stream_with_context(generate()), mimetype=mimetype)
@@ -1,11 +1,23 @@
-from server.app import app, db
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, select
+
+from server.app import db, hash_pool
 from server.models import User, Recipe
 
-with app.app_context():
-    print("🧹 Clearing old data...")
+
+def clear():
     Recipe.query.delete()
     User.query.delete()
+    db.session.commit()
 
+
+def seed_demo():
     print("🌱 Seeding users and recipes...")
 
     user1 = User(
@@ -41,4 +53,149 @@ with app.app_context():
 
     db.session.add_all([recipe1, recipe2])
     db.session.commit()
-    print("✅ Seeded!")
+
+
+def seed_fake(n_users, n_recipes, password="password", seed=None):
+    """Seed n_users Faker users sharing one password and n_recipes spread
+    across them. Returns the usernames so callers can log in as them."""
+    # Faker takes tens of milliseconds to import, so only seeding pays for it.
+    from faker import Faker
+    fake = Faker()
+    rng = random.Random(seed)
+    if seed is not None:
+        fake.seed_instance(seed)
+
+    # One bcrypt hash shared by every user keeps seeding from being
+    # dominated by hashing.
+    template = User(username="template")
+    template.password_hash = password
+    hashed = template._password_hash
+
+    usernames = [f"{fake.user_name()}{i}" for i in range(n_users)]
+    users = [
+        User(
+            username=username,
+            _password_hash=hashed,
+            image_url=fake.image_url(),
+            bio=fake.sentence()
+        )
+        for username in usernames
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+
+    user_ids = [user.id for user in users]
+    db.session.add_all([
+        Recipe(
+            title=fake.sentence(nb_words=4),
+            instructions=fake.paragraph(nb_sentences=6, variable_nb_sentences=False),
+            minutes_to_complete=rng.randint(5, 180),
+            user_id=rng.choice(user_ids)
+        )
+        for _ in range(n_recipes)
+    ])
+    db.session.commit()
+    return usernames
+
+
+def recipe_rows(chunk_index, count, user_ids, words, seed):
+    # Seeded per chunk, so the output is the same whichever worker
+    # generates it and however many workers there are.
+    rng = random.Random(seed * 1_000_003 + chunk_index)
+    sentence = lambda n: " ".join(rng.choices(words, k=n)).capitalize() + "."
+    first_user, last_user = user_ids
+    return [
+        {
+            "title": " ".join(rng.choices(words, k=rng.randint(2, 5))).title(),
+            "instructions": " ".join(sentence(rng.randint(8, 16)) for _ in range(rng.randint(3, 6))),
+            "minutes_to_complete": rng.randint(5, 180),
+            "user_id": rng.randint(first_user, last_user),
+        }
+        for _ in range(count)
+    ]
+
+
+def recipe_chunk(args):
+    return recipe_rows(*args)
+
+
+@click.command("seed-bulk")
+@click.option("--users", "n_users", default=1000, show_default=True)
+@click.option("--recipes", "n_recipes", default=100000, show_default=True)
+@click.option("--seed", default=0, show_default=True, help="Seed for deterministic output.")
+@click.option("--chunk-size", default=5000, show_default=True)
+@click.option("--workers", default=1, show_default=True, help="Processes generating recipe rows; one connection inserts them.")
+@click.option("--password-pool", default=8, show_default=True,
+              help="Distinct passwords (password0..N-1) hashed once and reused.")
+@click.option("--clear/--no-clear", default=False, help="Delete existing users and recipes first.")
+@with_appcontext
+def seed_bulk(n_users, n_recipes, seed, chunk_size, workers, password_pool, clear):
+    """Generate N users and M recipes with Core bulk inserts."""
+    if clear:
+        with db.engine.begin() as conn:
+            conn.execute(Recipe.__table__.delete())
+            conn.execute(User.__table__.delete())
+
+    from faker import Faker
+    fake = Faker()
+    fake.seed_instance(seed)
+    words = fake.words(nb=500, unique=True)
+
+    started = time.perf_counter()
+    hashes = [hash_pool.generate_password_hash(f"password{i}") for i in range(password_pool)]
+    click.echo(f"password hashes: {password_pool} in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    first_id = (db.session.scalar(select(func.max(User.id))) or 0) + 1
+    users = [
+        {
+            "id": first_id + i,
+            "username": f"{fake.user_name()}{first_id + i}",
+            "_password_hash": hashes[i % password_pool],
+            "image_url": f"https://picsum.photos/seed/{first_id + i}/200",
+            "bio": fake.sentence(),
+        }
+        for i in range(n_users)
+    ]
+    with db.engine.begin() as conn:
+        for start in range(0, len(users), chunk_size):
+            conn.execute(insert(User.__table__), users[start:start + chunk_size])
+    user_seconds = time.perf_counter() - started
+    click.echo(f"users: {n_users} in {user_seconds:.2f}s ({n_users / max(user_seconds, 1e-9):,.0f} rows/s)")
+
+    if n_recipes and n_users:
+        user_ids = (first_id, first_id + n_users - 1)
+        chunks = [
+            (index, min(chunk_size, n_recipes - start))
+            for index, start in enumerate(range(0, n_recipes, chunk_size))
+        ]
+        jobs = [(index, count, user_ids, words, seed) for index, count in chunks]
+
+        # SQLite takes one writer at a time, so workers only generate rows
+        # and a single transaction inserts them, in chunk order.
+        started = time.perf_counter()
+        inserted = 0
+        with ExitStack() as stack:
+            if workers > 1:
+                executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+                batches = executor.map(recipe_chunk, jobs)
+            else:
+                batches = map(recipe_chunk, jobs)
+            conn = stack.enter_context(db.engine.begin())
+            for rows in batches:
+                conn.execute(insert(Recipe.__table__), rows)
+                inserted += len(rows)
+        recipe_seconds = time.perf_counter() - started
+        click.echo(
+            f"recipes: {inserted} in {recipe_seconds:.2f}s ({inserted / max(recipe_seconds, 1e-9):,.0f} rows/s)"
+        )
+
+
+if __name__ == '__main__':
+    from server.app import app
+
+    with app.app_context():
+        print("🧹 Clearing old data...")
+        clear()
+        seed_demo()
+        print("✅ Seeded!")
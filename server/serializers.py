@@ -0,0 +1,126 @@
+import json
+from functools import lru_cache
+from operator import attrgetter
+
+from flask import current_app, make_response
+from sqlalchemy import select
+
+from server.models import User, Recipe
+
+try:
+    import orjson
+except ImportError:  # optional faster encoder
+    orjson = None
+
+
+class Schema:
+    """Field list for a model, compiled once per field selection.
+
+    dump() reads attributes off an ORM object; dump_row() maps a row tuple
+    selected with columns() straight to a dict without building objects."""
+
+    model = None
+    fields = ()
+    nested = {}
+    # Nested objects that can also be read from denormalized columns on this
+    # model instead of through a join: {name: {child field: column name}}.
+    snapshots = {}
+
+    def __init__(self, only=None):
+        available = self.fields + tuple(self.nested)
+        if only is not None:
+            unknown = set(only) - set(available)
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}.")
+        selected = available if only is None else [name for name in available if name in only]
+
+        self.names = tuple(name for name in selected if name in self.fields)
+        self.children = tuple((name, self.nested[name]()) for name in selected if name in self.nested)
+        self.width = len(self.names) + sum(child.width for _, child in self.children)
+        self._getter = attrgetter(*self.names) if self.names else None
+
+    @classmethod
+    @lru_cache(maxsize=64)
+    def for_fields(cls, fields):
+        if not fields:
+            return cls()
+        return cls(only=[name.strip() for name in fields.split(",") if name.strip()])
+
+    @classmethod
+    def from_request(cls, args):
+        """Schema for the request's ``?fields=`` selection. Raises ValueError
+        for unknown field names."""
+        return cls.for_fields(args.get("fields", ""))
+
+    def statement(self, key, snapshot=False):
+        """Core select of ``key`` followed by columns(); rows from it go to
+        dump_row(row, 1). With snapshot, nested objects that have snapshot
+        columns are read from them and not joined."""
+        stmt = select(key, *self.columns(snapshot))
+        for name, _ in self.children:
+            if snapshot and name in self.snapshots:
+                continue
+            relationship = getattr(self.model, name).property
+            stmt = stmt.join(relationship.mapper.class_, relationship.primaryjoin)
+        return stmt
+
+    def columns(self, snapshot=False):
+        columns = [getattr(self.model, name) for name in self.names]
+        for name, child in self.children:
+            if snapshot and name in self.snapshots:
+                columns.extend(getattr(self.model, self.snapshots[name][field]) for field in child.names)
+            else:
+                columns.extend(child.columns())
+        return columns
+
+    def dump(self, obj):
+        if len(self.names) == 1:
+            data = {self.names[0]: self._getter(obj)}
+        else:
+            data = dict(zip(self.names, self._getter(obj))) if self._getter else {}
+        for name, child in self.children:
+            data[name] = child.dump(getattr(obj, name))
+        return data
+
+    def dump_row(self, row, start=0):
+        end = start + len(self.names)
+        data = dict(zip(self.names, row[start:end]))
+        for name, child in self.children:
+            data[name] = child.dump_row(row, end)
+            end += child.width
+        return data
+
+
+class UserSchema(Schema):
+    model = User
+    fields = ("id", "username", "image_url", "bio")
+
+
+class RecipeSchema(Schema):
+    model = Recipe
+    fields = ("id", "title", "instructions", "minutes_to_complete")
+    nested = {"user": UserSchema}
+    snapshots = {"user": {
+        "id": "user_id",
+        "username": "author_username",
+        "image_url": "author_image_url",
+        "bio": "author_bio",
+    }}
+
+
+user_schema = UserSchema()
+recipe_schema = RecipeSchema()
+
+
+def dumps(data):
+    if orjson is not None and current_app.config["JSON_BACKEND"] != "stdlib":
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, separators=(",", ":"))
+
+
+def output_json(data, code, headers=None):
+    """flask_restful representation using the configured JSON backend."""
+    response = make_response(dumps(data) + "\n", code)
+    response.mimetype = "application/json"
+    response.headers.extend(headers or {})
+    return response
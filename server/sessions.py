@@ -0,0 +1,353 @@
+import hashlib
+import heapq
+import itertools
+import json
+import secrets
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from werkzeug.datastructures import CallbackDict
+
+from server.cache import SharedCache
+
+
+def session_key(token):
+    # Only a digest of the cookie token is stored, so the table can't be
+    # replayed as cookies and the key is safe to show in session listings.
+    return hashlib.sha256(token.encode("ascii")).hexdigest()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, token=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.token = token
+        # The user the stored record belongs to; a different user_id at save
+        # time means a login or logout, which gets a fresh token.
+        self.loaded_user_id = self.get("user_id")
+        self.expires_at = expires_at
+        self.modified = False
+
+    @property
+    def key(self):
+        return session_key(self.token) if self.token else None
+
+
+class MemorySessionBackend:
+    """Per-process session store. Lookups and revocations are dict
+    operations; expired entries are swept from a heap in bounded batches."""
+
+    def __init__(self):
+        self._records = {}
+        self._by_user = {}
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    def load(self, key):
+        record = self._records.get(key)
+        if record is None:
+            return None
+        _, data, expires_at = record
+        return data, expires_at
+
+    def save(self, key, user_id, data, expires_at):
+        with self._lock:
+            self._discard(key)
+            self._records[key] = (user_id, data, expires_at)
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(key)
+            heapq.heappush(self._expiry, (expires_at, key))
+
+    def _discard(self, key):
+        record = self._records.pop(key, None)
+        if record is not None and record[0] is not None:
+            keys = self._by_user.get(record[0])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_user[record[0]]
+        return record is not None
+
+    def delete(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def list_for_user(self, user_id):
+        return sorted(
+            (key, self._records[key][2]) for key in self._by_user.get(user_id, ())
+        )
+
+    def revoke(self, user_id, key):
+        with self._lock:
+            record = self._records.get(key)
+            if record is None or record[0] != user_id:
+                return False
+            return self._discard(key)
+
+    def revoke_all(self, user_id, keep=None):
+        with self._lock:
+            keys = [key for key in self._by_user.get(user_id, ()) if key != keep]
+            for key in keys:
+                self._discard(key)
+            return len(keys)
+
+    def sweep(self, now, limit):
+        removed = 0
+        with self._lock:
+            while self._expiry and removed < limit and self._expiry[0][0] <= now:
+                expires_at, key = heapq.heappop(self._expiry)
+                record = self._records.get(key)
+                # Refreshed sessions leave their old heap entries behind.
+                if record is not None and record[2] == expires_at:
+                    self._discard(key)
+                    removed += 1
+        return removed
+
+
+class SqlSessionBackend:
+    """Stores sessions in the indexed ``sessions`` table. Every operation is
+    a primary-key or index lookup run on its own short transaction, so it
+    never interferes with the request's ORM session."""
+
+    def __init__(self, db):
+        self.db = db
+
+    @property
+    def table(self):
+        from server.models import SessionRecord
+        return SessionRecord.__table__
+
+    def load(self, key):
+        t = self.table
+        with self.db.engine.connect() as conn:
+            row = conn.execute(
+                select(t.c.data, t.c.expires_at).where(t.c.key == key)
+            ).first()
+        if row is None:
+            return None
+        return json.loads(row.data), row.expires_at
+
+    def save(self, key, user_id, data, expires_at):
+        t = self.table
+        stmt = insert(t).values(
+            key=key, user_id=user_id, data=json.dumps(data), expires_at=expires_at
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[t.c.key],
+            set_={"user_id": user_id, "data": stmt.excluded.data, "expires_at": expires_at}
+        )
+        with self.db.engine.begin() as conn:
+            conn.execute(stmt)
+
+    def delete(self, key):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            conn.execute(delete(t).where(t.c.key == key))
+
+    def list_for_user(self, user_id):
+        t = self.table
+        with self.db.engine.connect() as conn:
+            rows = conn.execute(
+                select(t.c.key, t.c.expires_at)
+                .where(t.c.user_id == user_id)
+                .order_by(t.c.key)
+            )
+            return [tuple(row) for row in rows]
+
+    def revoke(self, user_id, key):
+        t = self.table
+        with self.db.engine.begin() as conn:
+            result = conn.execute(
+                delete(t).where(t.c.key == key, t.c.user_id == user_id)
+            )
+        return result.rowcount > 0
+
+    def revoke_all(self, user_id, keep=None):
+        t = self.table
+        stmt = delete(t).where(t.c.user_id == user_id)
+        if keep is not None:
+            stmt = stmt.where(t.c.key != keep)
+        with self.db.engine.begin() as conn:
+            return conn.execute(stmt).rowcount
+
+    def sweep(self, now, limit):
+        t = self.table
+        expired = (
+            select(t.c.key)
+            .where(t.c.expires_at <= now)
+            .order_by(t.c.expires_at)
+            .limit(limit)
+        )
+        with self.db.engine.begin() as conn:
+            return conn.execute(delete(t).where(t.c.key.in_(expired))).rowcount
+
+
+class CachedSessionBackend:
+    """Read-through cache in front of another backend, so a request with a
+    live session doesn't touch the session store at all. Every write and
+    revocation goes to the backend first and then drops or replaces the
+    cached entry, so the cache must be one every process shares: a
+    per-process cache would keep serving a session that another worker
+    had just revoked."""
+
+    def __init__(self, backend, cache, ttl):
+        self.backend = backend
+        self.cache = cache
+        self.ttl = ttl
+
+    def cached(self, key):
+        cached = self.cache.get(key)
+        return None if cached is None else tuple(cached)
+
+    def remember(self, key, data, expires_at):
+        ttl = min(self.ttl, int(expires_at - time.time()))
+        if ttl > 0:
+            self.cache.set(key, [data, expires_at], ttl=ttl)
+
+    def load(self, key):
+        cached = self.cached(key)
+        if cached is not None:
+            return cached
+        record = self.backend.load(key)
+        if record is not None:
+            self.remember(key, *record)
+        return record
+
+    def save(self, key, user_id, data, expires_at):
+        self.backend.save(key, user_id, data, expires_at)
+        self.remember(key, data, expires_at)
+
+    def delete(self, key):
+        self.backend.delete(key)
+        self.cache.delete(key)
+
+    def list_for_user(self, user_id):
+        return self.backend.list_for_user(user_id)
+
+    def revoke(self, user_id, key):
+        revoked = self.backend.revoke(user_id, key)
+        if revoked:
+            self.cache.delete(key)
+        return revoked
+
+    def revoke_all(self, user_id, keep=None):
+        keys = [key for key, _ in self.backend.list_for_user(user_id) if key != keep]
+        revoked = self.backend.revoke_all(user_id, keep=keep)
+        for key in keys:
+            self.cache.delete(key)
+        return revoked
+
+    def sweep(self, now, limit):
+        # Cached entries carry their own expiry, which open_session checks.
+        return self.backend.sweep(now, limit)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Keeps session data server-side; the cookie only carries a signed
+    random token. Logging out deletes the stored record, so a copied cookie
+    stops working immediately, and logging in or out issues a new token, so
+    one planted beforehand never becomes an authenticated session."""
+
+    def __init__(self, backend, sweep_interval=100, sweep_batch=500):
+        self.backend = backend
+        self.sweep_interval = sweep_interval
+        self.sweep_batch = sweep_batch
+        self._saves = itertools.count(1)
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt="server-side-session")
+
+    def token_from_cookie(self, app, cookie):
+        if not cookie:
+            return None
+        try:
+            return self._signer(app).unsign(cookie).decode("ascii")
+        except BadSignature:
+            return None
+
+    def open_session(self, app, request):
+        token = self.token_from_cookie(app, request.cookies.get(self.get_cookie_name(app)))
+        if token is None:
+            return ServerSideSession()
+
+        record = self.backend.load(session_key(token))
+        if record is None:
+            return ServerSideSession()
+        data, expires_at = record
+        if expires_at <= time.time():
+            return ServerSideSession()
+        return ServerSideSession(data, token=token, expires_at=expires_at)
+
+    def save_session(self, app, session, response):
+        # Amortize expiry: every sweep_interval-th save deletes at most
+        # sweep_batch expired sessions, so no single request pays for a
+        # full scan.
+        if next(self._saves) % self.sweep_interval == 0:
+            self.backend.sweep(time.time(), self.sweep_batch)
+
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.token is not None:
+                self.backend.delete(session.key)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        stale = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if not session.modified and not stale:
+            return
+
+        if session.token is not None and session.get("user_id") != session.loaded_user_id:
+            self.backend.delete(session.key)
+            session.token = None
+        if session.token is None:
+            session.token = secrets.token_urlsafe(32)
+        session.loaded_user_id = session.get("user_id")
+        session.expires_at = int(now + lifetime)
+        self.backend.save(session.key, session.get("user_id"), dict(session), session.expires_at)
+
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.token).decode("ascii"),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def init_sessions(app, db):
+    app.config.setdefault("SESSION_BACKEND", "sql")
+    app.config.setdefault("SESSION_SWEEP_INTERVAL", 100)
+    app.config.setdefault("SESSION_SWEEP_BATCH", 500)
+    app.config.setdefault("SESSION_CACHE_BACKEND", None)
+    app.config.setdefault("SESSION_CACHE_CLIENT", None)
+    app.config.setdefault("SESSION_CACHE_TTL", 60)
+
+    if app.config["SESSION_BACKEND"] == "memory":
+        backend = MemorySessionBackend()
+    else:
+        backend = SqlSessionBackend(db)
+        if app.config["SESSION_CACHE_BACKEND"] == "shared":
+            client = app.config["SESSION_CACHE_CLIENT"]
+            if client is None:
+                raise RuntimeError("SESSION_CACHE_BACKEND 'shared' needs SESSION_CACHE_CLIENT.")
+            cache = SharedCache(client, prefix="sessions:")
+            backend = CachedSessionBackend(backend, cache, app.config["SESSION_CACHE_TTL"])
+    app.session_interface = ServerSideSessionInterface(
+        backend,
+        sweep_interval=app.config["SESSION_SWEEP_INTERVAL"],
+        sweep_batch=app.config["SESSION_SWEEP_BATCH"],
+    )
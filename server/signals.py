@@ -0,0 +1,12 @@
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent once a recipe write has committed, with the app as sender and the
+# keyword arguments
+#   action     "created", "updated", "deleted" or "bulk_created"
+#   recipe_id  the recipe's id (None for bulk inserts)
+#   user_id    the author
+#   fields     the columns written
+# so listing, ETag and search caches can invalidate just what changed.
+recipe_changed = _signals.signal("recipe-changed")
@@ -0,0 +1,60 @@
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, or_, select, update
+
+from server.app import db
+from server.models import User, Recipe
+
+
+def stale_author_snapshots():
+    return or_(
+        Recipe.author_username.is_distinct_from(User.username),
+        Recipe.author_image_url.is_distinct_from(User.image_url),
+        Recipe.author_bio.is_distinct_from(User.bio),
+    )
+
+
+def repair_author_snapshots(batch_size=1000, pause=0.0, progress=None):
+    """Rewrite missing or stale recipe author snapshots from users.
+
+    Walks recipes in id ranges of batch_size and commits after each, so
+    writers are never locked out for longer than one small UPDATE; pause
+    adds a sleep between batches to leave room for live traffic. Rows that
+    already match are not touched. Returns the number of rows rewritten."""
+    max_id = db.session.scalar(select(func.max(Recipe.id))) or 0
+    repaired = 0
+    for low in range(0, max_id, batch_size):
+        result = db.session.execute(
+            update(Recipe)
+            .where(
+                Recipe.user_id == User.id,
+                Recipe.id > low,
+                Recipe.id <= low + batch_size,
+                stale_author_snapshots(),
+            )
+            .values(author_username=User.username, author_image_url=User.image_url, author_bio=User.bio)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        repaired += result.rowcount
+        if progress is not None:
+            progress(min(low + batch_size, max_id), max_id, repaired)
+        if pause:
+            time.sleep(pause)
+    return repaired
+
+
+@click.command("repair-author-snapshots")
+@click.option("--batch-size", default=1000, show_default=True)
+@click.option("--pause", default=0.0, show_default=True, help="Seconds to sleep between batches.")
+@with_appcontext
+def repair_author_snapshots_command(batch_size, pause):
+    """Backfill or repair recipes.author_* from users, in small batches."""
+    def progress(done, total, repaired):
+        click.echo(f"ids {done}/{total}: {repaired} rewritten")
+
+    started = time.perf_counter()
+    repaired = repair_author_snapshots(batch_size, pause, progress)
+    click.echo(f"{repaired} snapshots rewritten in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,127 @@
+import time
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, text
+
+from server.app import db
+from server.models import (
+    MINUTES_BUCKET_TIERS, STAT_COUNTERS, MinutesBucket, Recipe, SignupDay, StatCounter, User,
+    minutes_bucket_sql
+)
+
+PERCENTILES = (50, 90, 99)
+
+
+def bucket_width(bucket):
+    for upper, width in MINUTES_BUCKET_TIERS:
+        if upper is None or bucket < upper:
+            return width
+
+
+def percentiles(buckets, total, wanted=PERCENTILES):
+    """Estimate percentiles from (bucket, count) rows sorted by bucket.
+
+    Each estimate is the middle of the bucket holding that rank, so it is
+    exact below an hour and within half a bucket width above."""
+    results = {f"p{p}": None for p in wanted}
+    if not total:
+        return results
+    ranks = iter(wanted)
+    p = next(ranks)
+    seen = 0
+    for bucket, count in buckets:
+        seen += count
+        while p is not None and seen >= total * p / 100:
+            results[f"p{p}"] = bucket + (bucket_width(bucket) - 1) / 2
+            p = next(ranks, None)
+        if p is None:
+            break
+    return results
+
+
+def minutes_summary():
+    counters = dict(db.session.execute(select(StatCounter.name, StatCounter.value)).all())
+    timed = counters.get("timed_recipes", 0)
+    # Two separate subqueries so each is answered from the index.
+    low, high = db.session.execute(select(
+        select(func.min(Recipe.minutes_to_complete)).scalar_subquery(),
+        select(func.max(Recipe.minutes_to_complete)).scalar_subquery(),
+    )).one()
+    buckets = db.session.execute(
+        select(MinutesBucket.bucket, MinutesBucket.count)
+        .where(MinutesBucket.count > 0)
+        .order_by(MinutesBucket.bucket)
+    ).all()
+    return counters, {
+        "count": timed,
+        "average": round(counters.get("minutes_sum", 0) / timed, 1) if timed else None,
+        "min": low,
+        "max": high,
+        **percentiles(buckets, timed),
+    }
+
+
+def stats_summary(days, top):
+    counters, minutes = minutes_summary()
+    signups = db.session.execute(
+        select(SignupDay.day, SignupDay.count)
+        .where(SignupDay.day >= func.date("now", f"-{days - 1} days"), SignupDay.count > 0)
+        .order_by(SignupDay.day)
+    ).all()
+    authors = db.session.execute(
+        select(User.id, User.username, User.recipe_count)
+        .where(User.recipe_count > 0)
+        .order_by(User.recipe_count.desc(), User.id.desc())
+        .limit(top)
+    ).all()
+    return {
+        "users": counters.get("users", 0),
+        "recipes": counters.get("recipes", 0),
+        "minutes_to_complete": minutes,
+        "signups_per_day": [{"day": day, "count": count} for day, count in signups],
+        "top_authors": [
+            {"id": user_id, "username": username, "recipe_count": count}
+            for user_id, username, count in authors
+        ],
+    }
+
+
+REBUILD_SQL = [
+    "DELETE FROM stat_counters",
+    "INSERT INTO stat_counters (name, value) VALUES "
+    + ", ".join(f"('{name}', 0)" for name in STAT_COUNTERS),
+    "UPDATE stat_counters SET value = (SELECT count(*) FROM users) WHERE name = 'users'",
+    "UPDATE stat_counters SET value = (SELECT count(*) FROM recipes) WHERE name = 'recipes'",
+    "UPDATE stat_counters SET value = (SELECT count(minutes_to_complete) FROM recipes) "
+    "WHERE name = 'timed_recipes'",
+    "UPDATE stat_counters SET value = (SELECT coalesce(sum(minutes_to_complete), 0) FROM recipes) "
+    "WHERE name = 'minutes_sum'",
+    "DELETE FROM recipe_minutes_buckets",
+    f"""INSERT INTO recipe_minutes_buckets (bucket, count)
+        SELECT {minutes_bucket_sql("minutes_to_complete")} AS bucket, count(*) FROM recipes
+        WHERE minutes_to_complete IS NOT NULL GROUP BY bucket""",
+    "DELETE FROM signup_days",
+    """INSERT INTO signup_days (day, count)
+        SELECT date(created_at) AS day, count(*) FROM users WHERE created_at IS NOT NULL GROUP BY day""",
+    """UPDATE users SET recipe_count = (SELECT count(*) FROM recipes WHERE recipes.user_id = users.id)
+        WHERE recipe_count IS NOT (SELECT count(*) FROM recipes WHERE recipes.user_id = users.id)""",
+]
+
+
+def rebuild_stats():
+    """Recompute every summary table, and users.recipe_count, from the
+    base tables in one transaction. The triggers keep them current after
+    that; this is for repairs, restores and imports that bypassed them."""
+    for statement in REBUILD_SQL:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+@click.command("rebuild-stats")
+@with_appcontext
+def rebuild_stats_command():
+    """Recompute the /stats summary tables from scratch."""
+    started = time.perf_counter()
+    rebuild_stats()
+    click.echo(f"stats rebuilt in {time.perf_counter() - started:.2f}s")
@@ -1,14 +1,41 @@
+import base64
+from contextlib import contextmanager
+import json
 from faker import Faker
 from random import randint
 import pytest
+from flask import request
+from sqlalchemy import event, text
 
 from server.app import app, db
-from server.models import User, Recipe
+from server.cache import FakeSharedClient
+from server.models import User, Recipe, SessionRecord
+from server.pagination import encode_cursor
+from server.signals import recipe_changed
 
 app.secret_key = b'a\xdb\xd2\x13\x93\xc1\xe9\x97\xef2\xe3\x004U\xd1Z'
 fake = Faker()
 
 
+@contextmanager
+def count_queries():
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        # Without a shared session cache every request looks its session
+        # up first; the budgets here are for the route's own queries.
+        if "FROM sessions" not in statement:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
 class TestSignup:
     def test_creates_users_at_signup(self):
         with app.app_context():
@@ -228,3 +255,860 @@ class TestRecipeIndex:
                 'minutes_to_complete': randint(15, 90)
             })
             assert response.status_code == 422
+
+            for minutes in ('abc', 10**30, -1):
+                response = client.post('/recipes', json={
+                    'title': fake.sentence(),
+                    'instructions': fake.paragraph(nb_sentences=8),
+                    'minutes_to_complete': minutes
+                })
+                assert response.status_code == 422, minutes
+            with app.app_context():
+                assert Recipe.query.count() == 0
+
+
+class TestRecipePagination:
+    def seed(self):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            ash = User(username="ashketchum")
+            ash.password_hash = 'pikachu'
+            misty = User(username="mistywater")
+            misty.password_hash = 'togepi'
+            db.session.add_all([ash, misty])
+            db.session.commit()
+
+            db.session.add_all([
+                Recipe(
+                    title=f"{'Poke' if i % 2 else 'Sea'} Dish {i:02d}",
+                    instructions=fake.paragraph(nb_sentences=8),
+                    minutes_to_complete=10 * i,
+                    user=ash if i % 2 else misty
+                ) for i in range(1, 8)
+            ])
+            db.session.commit()
+            return ash.id
+
+    def test_pages_with_cursor(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+            seen = []
+            response = client.get('/recipes?limit=3')
+            while True:
+                assert response.status_code == 200
+                seen.extend(r['id'] for r in response.get_json())
+                cursor = response.headers.get('X-Next-Cursor')
+                if not cursor:
+                    break
+                response = client.get(f'/recipes?limit=3&cursor={cursor}')
+
+            assert len(seen) == 7
+            assert seen == sorted(seen)
+
+    def test_filters_recipes(self):
+        ash_id = self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+            data = client.get(f'/recipes?user_id={ash_id}').get_json()
+            assert {r['user']['id'] for r in data} == {ash_id}
+
+            data = client.get('/recipes?min_minutes=20&max_minutes=40').get_json()
+            assert [r['minutes_to_complete'] for r in data] == [20, 30, 40]
+
+            data = client.get('/recipes?title_prefix=Sea').get_json()
+            assert len(data) == 3
+            assert all(r['title'].startswith('Sea') for r in data)
+
+    def test_400s_for_bad_cursor(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            response = client.get('/recipes?cursor=not-a-cursor')
+            assert response.status_code == 400
+
+    def test_400s_for_out_of_range_integers(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            for query in (f'user_id={10**30}', f'min_minutes={10**30}', f'max_minutes=-{10**30}',
+                          f'cursor={encode_cursor(10**30)}', f'cursor={encode_cursor(True)}'):
+                response = client.get(f'/recipes?{query}')
+                assert response.status_code == 400, query
+                assert response.get_json()['error']
+
+            assert client.get(f'/recipes?max_minutes={2**63 - 1}').status_code == 200
+
+    def test_title_prefix_ending_in_last_code_point(self):
+        self.seed()
+        with app.app_context():
+            ash = User.query.filter_by(username='ashketchum').first()
+            db.session.add_all([
+                Recipe(title=title, instructions=fake.paragraph(nb_sentences=8), user=ash)
+                for title in ('Sea\U0010ffff Salt', 'Sea\U0010ffff\U0010ffff', 'Seb')
+            ])
+            db.session.commit()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            response = client.get('/recipes', query_string={'title_prefix': 'Sea\U0010ffff'})
+            assert response.status_code == 200
+            assert sorted(r['title'] for r in response.get_json()) == [
+                'Sea\U0010ffff Salt', 'Sea\U0010ffff\U0010ffff'
+            ]
+            response = client.get('/recipes', query_string={'title_prefix': '\U0010ffff'})
+            assert response.get_json() == []
+
+    def test_selects_fields(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+            response = client.get('/recipes?fields=title&limit=3')
+            assert response.status_code == 200
+            assert [set(r) for r in response.get_json()] == [{'title'}] * 3
+            # The hidden id still drives the cursor.
+            cursor = response.headers['X-Next-Cursor']
+            data = client.get(f'/recipes?fields=title,user&cursor={cursor}').get_json()
+            assert len(data) == 4
+            assert set(data[0]) == {'title', 'user'}
+            assert set(data[0]['user']) == {'id', 'username', 'image_url', 'bio'}
+
+            response = client.get('/recipes?fields=title,password')
+            assert response.status_code == 400
+
+
+class TestRecipeQueryCount:
+    def seed(self, n_users, n_recipes):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            users = [User(username=f"trainer{i}") for i in range(n_users)]
+            for user in users:
+                user.password_hash = 'secret'
+            db.session.add_all(users)
+            db.session.commit()
+
+            db.session.add_all([
+                Recipe(
+                    title=fake.sentence(),
+                    instructions=fake.paragraph(nb_sentences=8),
+                    minutes_to_complete=randint(15, 90),
+                    user=users[i % n_users]
+                ) for i in range(n_recipes)
+            ])
+            db.session.commit()
+
+    def list_query_count(self):
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'trainer0', 'password': 'secret'})
+            with count_queries() as statements:
+                response = client.get('/recipes')
+            assert response.status_code == 200
+            return len(statements)
+
+    def test_list_query_count_is_constant(self):
+        self.seed(n_users=1, n_recipes=2)
+        small = self.list_query_count()
+        self.seed(n_users=10, n_recipes=20)
+        large = self.list_query_count()
+
+        assert small == large
+        # change-counter read for the ETag and one joined row query
+        assert large <= 2
+
+    def test_create_query_count(self):
+        self.seed(n_users=1, n_recipes=0)
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'trainer0', 'password': 'secret'})
+            with count_queries() as statements:
+                response = client.post('/recipes', json={
+                    'title': fake.sentence(),
+                    'instructions': fake.paragraph(nb_sentences=8),
+                    'minutes_to_complete': randint(15, 90)
+                })
+            assert response.status_code == 201
+            assert len(statements) <= 2
+
+
+class TestRecipeExport:
+    def seed(self):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            user = User(username="Slagathor")
+            user.password_hash = 'secret'
+            db.session.add(user)
+            db.session.commit()
+
+            db.session.add_all([
+                Recipe(
+                    title=fake.sentence(),
+                    instructions=fake.paragraph(nb_sentences=8),
+                    minutes_to_complete=randint(15, 90),
+                    user=user
+                ) for _ in range(25)
+            ])
+            db.session.commit()
+
+    def test_streams_json_array(self):
+        self.seed()
+        app.config["RECIPES_EXPORT_BATCH_SIZE"] = 10
+        try:
+            with app.test_client() as client:
+                client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+                response = client.get('/recipes/export')
+                assert response.status_code == 200
+                assert response.is_streamed
+                data = json.loads(response.get_data(as_text=True))
+        finally:
+            app.config["RECIPES_EXPORT_BATCH_SIZE"] = 500
+
+        assert len(data) == 25
+        assert data[0]['user']['username'] == 'Slagathor'
+
+    def test_streams_ndjson(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+            response = client.get('/recipes/export', headers={'Accept': 'application/x-ndjson'})
+            assert response.status_code == 200
+            assert response.mimetype == 'application/x-ndjson'
+            lines = response.get_data(as_text=True).splitlines()
+
+        assert len(lines) == 25
+        assert all(json.loads(line)['title'] for line in lines)
+
+    def test_401s_when_not_logged_in(self):
+        with app.test_client() as client:
+            with client.session_transaction() as session:
+                session['user_id'] = None
+            response = client.get('/recipes/export')
+            assert response.status_code == 401
+
+
+class TestCheckSessionCache:
+    def signup(self, client):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+        response = client.post('/signup', json={
+            'username': 'ashketchum',
+            'password': 'pikachu',
+            'bio': 'Gotta catch em all',
+        })
+        return response.get_json()['id']
+
+    def test_cache_hit_runs_no_sql(self, make_app):
+        cached = make_app(SESSION_CACHE_BACKEND='shared', SESSION_CACHE_CLIENT=FakeSharedClient())
+        with cached.test_client() as client:
+            self.signup(client)
+            assert client.get('/check_session').status_code == 200
+
+            statements = []
+            record = lambda conn, cursor, statement, *args: statements.append(statement)
+            with cached.app_context():
+                engine = db.engine
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                response = client.get('/check_session')
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+            assert response.status_code == 200
+            assert response.get_json()['username'] == 'ashketchum'
+            assert statements == []
+
+    def test_profile_change_invalidates_cache(self):
+        with app.test_client() as client:
+            user_id = self.signup(client)
+            client.get('/check_session')
+
+            with app.app_context():
+                db.session.get(User, user_id).bio = 'Pokemon master'
+                db.session.commit()
+
+            assert client.get('/check_session').get_json()['bio'] == 'Pokemon master'
+
+    def test_bulk_delete_invalidates_cache(self):
+        with app.test_client() as client:
+            self.signup(client)
+            client.get('/check_session')
+
+            with app.app_context():
+                User.query.delete()
+                db.session.commit()
+
+            assert client.get('/check_session').status_code == 401
+
+
+class TestServerSideSessions:
+    def login(self, client):
+        return client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+    def seed(self):
+        with app.app_context():
+            SessionRecord.query.delete()
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            user = User(username="ashketchum")
+            user.password_hash = 'pikachu'
+            db.session.add(user)
+            db.session.commit()
+
+    def test_logout_revokes_copied_cookie(self):
+        self.seed()
+
+        with app.test_client() as client:
+            self.login(client)
+            cookie = client.get_cookie('session')
+            client.delete('/logout')
+
+        with app.test_client() as thief:
+            thief.set_cookie('session', cookie.value)
+            assert thief.get('/check_session').status_code == 401
+
+    def test_login_issues_new_token(self):
+        self.seed()
+
+        with app.test_client() as attacker:
+            with attacker.session_transaction() as session:
+                session['visited'] = True
+            planted = attacker.get_cookie('session').value
+
+        with app.test_client() as victim:
+            victim.set_cookie('session', planted)
+            assert self.login(victim).status_code == 200
+            assert victim.get_cookie('session').value != planted
+            assert victim.get('/check_session').status_code == 200
+
+        with app.test_client() as attacker:
+            attacker.set_cookie('session', planted)
+            assert attacker.get('/check_session').status_code == 401
+            with app.app_context():
+                assert SessionRecord.query.count() == 1
+
+    def test_logout_reaches_every_worker(self, make_app, tmp_path):
+        shared = FakeSharedClient()
+        for n, options in enumerate(({}, {'SESSION_CACHE_BACKEND': 'shared', 'SESSION_CACHE_CLIENT': shared})):
+            uri = f"sqlite:///{tmp_path / f'workers{n}.db'}"
+            first, second = make_app(SQLALCHEMY_DATABASE_URI=uri, **options), \
+                make_app(SQLALCHEMY_DATABASE_URI=uri, **options)
+            client, thief = first.test_client(), second.test_client()
+            client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+            thief.set_cookie('session', client.get_cookie('session').value)
+            assert thief.get('/check_session').status_code == 200
+            client.delete('/logout')
+            assert thief.get('/check_session').status_code == 401
+
+    def test_lists_and_revokes_sessions(self):
+        self.seed()
+
+        phone = app.test_client()
+        laptop = app.test_client()
+        self.login(phone)
+        self.login(laptop)
+
+        sessions = laptop.get('/sessions').get_json()
+        assert len(sessions) == 2
+        other = next(s for s in sessions if not s['current'])
+
+        assert laptop.delete(f"/sessions/{other['id']}").status_code == 204
+        assert phone.get('/check_session').status_code == 401
+        assert laptop.get('/check_session').status_code == 200
+        assert laptop.delete(f"/sessions/{other['id']}").status_code == 404
+
+    def test_sweeps_expired_sessions(self):
+        from server.sessions import MemorySessionBackend
+
+        backend = MemorySessionBackend()
+        backend.save('a', 1, {'user_id': 1}, expires_at=10)
+        backend.save('b', 1, {'user_id': 1}, expires_at=20)
+        backend.save('c', 2, {'user_id': 2}, expires_at=30)
+
+        assert backend.sweep(now=25, limit=1) == 1
+        assert backend.load('a') is None
+        assert backend.sweep(now=25, limit=10) == 1
+        assert backend.list_for_user(1) == []
+        assert backend.load('c') == ({'user_id': 2}, 30)
+
+
+class TestRecipeBulk:
+    def seed(self):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            user = User(username="Slagathor")
+            user.password_hash = 'secret'
+            db.session.add(user)
+            db.session.commit()
+
+    def recipe(self, **overrides):
+        recipe = {
+            'title': fake.sentence(),
+            'instructions': fake.paragraph(nb_sentences=8),
+            'minutes_to_complete': randint(15, 90),
+        }
+        recipe.update(overrides)
+        return recipe
+
+    def test_inserts_valid_rows_and_reports_errors(self):
+        self.seed()
+        app.config["RECIPES_BULK_CHUNK_SIZE"] = 3
+        try:
+            with app.test_client() as client:
+                client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+                rows = [self.recipe() for _ in range(10)]
+                rows[2]['title'] = ''
+                rows[7]['instructions'] = 'too short'
+                rows[8]['minutes_to_complete'] = 10**30
+                response = client.post('/recipes/bulk', json=rows)
+        finally:
+            app.config["RECIPES_BULK_CHUNK_SIZE"] = 500
+
+        assert response.status_code == 201
+        data = response.get_json()
+        assert data['inserted'] == 7
+        assert [e['index'] for e in data['errors']] == [2, 7, 8]
+        assert data['errors'][2]['errors'] == ['Minutes to complete is too large.']
+        with app.app_context():
+            assert Recipe.query.count() == 7
+
+    def test_accepts_ndjson(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+            lines = [json.dumps(self.recipe()) for _ in range(4)] + ['{not json']
+            response = client.post(
+                '/recipes/bulk',
+                data='\n'.join(lines),
+                content_type='application/x-ndjson'
+            )
+
+        assert response.status_code == 201
+        assert response.get_json()['inserted'] == 4
+        assert response.get_json()['errors'][0]['index'] == 4
+
+    def test_422s_when_nothing_is_valid(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+            response = client.post('/recipes/bulk', json=[self.recipe(instructions='short')])
+            assert response.status_code == 422
+
+
+class TestRecipeSearch:
+    def seed(self):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            user = User(username="Slagathor")
+            user.password_hash = 'secret'
+            db.session.add(user)
+            db.session.commit()
+
+            filler = "Stir everything together and let it rest for a while before serving warm."
+            db.session.add_all([
+                Recipe(title="Berry Poke Puffs", instructions=filler, minutes_to_complete=30, user=user),
+                Recipe(title="Seafood Surprise", instructions="Simmer the berries. " + filler,
+                       minutes_to_complete=45, user=user),
+                Recipe(title="Plain Toast", instructions=filler, minutes_to_complete=5, user=user),
+            ] + [
+                Recipe(title=f"Berry Tart {i}", instructions=filler, minutes_to_complete=20, user=user)
+                for i in range(5)
+            ])
+            db.session.commit()
+
+    def login(self, client):
+        client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+
+    def test_ranks_title_matches_first(self):
+        self.seed()
+
+        with app.test_client() as client:
+            self.login(client)
+            data = client.get('/recipes/search?q=berries').get_json()
+            titles = [r['title'] for r in data]
+            assert titles == ['Seafood Surprise']
+
+            data = client.get('/recipes/search?q=puff').get_json()
+            assert [r['title'] for r in data] == ['Berry Poke Puffs']
+
+    def test_paginates_results(self):
+        self.seed()
+
+        with app.test_client() as client:
+            self.login(client)
+            seen = []
+            response = client.get('/recipes/search?q=berry&limit=2')
+            while True:
+                assert response.status_code == 200
+                seen.extend(r['title'] for r in response.get_json())
+                cursor = response.headers.get('X-Next-Cursor')
+                if not cursor:
+                    break
+                response = client.get(f'/recipes/search?q=berry&limit=2&cursor={cursor}')
+
+            assert len(seen) == len(set(seen)) == 6
+            assert 'Plain Toast' not in seen
+
+    def test_index_follows_updates_and_deletes(self):
+        self.seed()
+
+        with app.app_context():
+            toast = Recipe.query.filter_by(title="Plain Toast").first()
+            toast.title = "Cinnamon Toast"
+            db.session.commit()
+            Recipe.query.filter(Recipe.title.like("Berry Tart%")).delete()
+            db.session.commit()
+
+        with app.test_client() as client:
+            self.login(client)
+            assert [r['title'] for r in client.get('/recipes/search?q=cinnamon').get_json()] == ['Cinnamon Toast']
+            assert len(client.get('/recipes/search?q=berry').get_json()) == 1
+
+    def test_400s_without_terms(self):
+        self.seed()
+
+        with app.test_client() as client:
+            self.login(client)
+            assert client.get('/recipes/search?q=%22%29').status_code == 400
+
+    def test_400s_for_bad_score_cursor(self):
+        self.seed()
+
+        with app.test_client() as client:
+            self.login(client)
+            nan = base64.urlsafe_b64encode(b'{"id":1,"score":NaN}').decode()
+            for cursor in (encode_cursor(1, score=True), encode_cursor(1, score='1'),
+                           encode_cursor(1, score=10**400), nan):
+                response = client.get(f'/recipes/search?q=berry&cursor={cursor}')
+                assert response.status_code == 400, cursor
+
+
+class TestRecipeConditionalRequests:
+    def seed(self):
+        with app.app_context():
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            user = User(username="Slagathor")
+            user.password_hash = 'secret'
+            db.session.add(user)
+            db.session.commit()
+
+            db.session.add_all([
+                Recipe(
+                    title=fake.sentence(),
+                    instructions=fake.paragraph(nb_sentences=8),
+                    minutes_to_complete=randint(15, 90),
+                    user=user
+                ) for _ in range(3)
+            ])
+            db.session.commit()
+
+    def test_304s_without_loading_rows(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+            response = client.get('/recipes')
+            etag = response.headers['ETag']
+            assert response.headers['Last-Modified']
+
+            with count_queries() as statements:
+                response = client.get('/recipes', headers={'If-None-Match': etag})
+            assert response.status_code == 304
+            assert response.get_data() == b''
+            assert len(statements) == 1
+            assert 'table_versions' in statements[0]
+
+    def test_etag_changes_with_data_and_query(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+            etag = client.get('/recipes').headers['ETag']
+            assert client.get('/recipes?limit=2').headers['ETag'] != etag
+
+            client.post('/recipes', json={
+                'title': fake.sentence(),
+                'instructions': fake.paragraph(nb_sentences=8),
+                'minutes_to_complete': randint(15, 90)
+            })
+            response = client.get('/recipes', headers={'If-None-Match': etag})
+            assert response.status_code == 200
+            assert response.headers['ETag'] != etag
+            assert len(response.get_json()) == 4
+
+    def test_304s_for_if_modified_since(self):
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'Slagathor', 'password': 'secret'})
+            last_modified = client.get('/recipes').headers['Last-Modified']
+            response = client.get('/recipes', headers={'If-Modified-Since': last_modified})
+            assert response.status_code == 304
+
+
+class TestUserRecipes:
+    def seed(self):
+        with app.app_context():
+            SessionRecord.query.delete()
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            ash = User(username="ashketchum")
+            ash.password_hash = 'pikachu'
+            misty = User(username="mistywater")
+            misty.password_hash = 'togepi'
+            db.session.add_all([ash, misty])
+            db.session.commit()
+
+            db.session.add_all([
+                Recipe(
+                    title=f"Dish {i:02d}",
+                    instructions=fake.paragraph(nb_sentences=8),
+                    minutes_to_complete=10 * i,
+                    user=ash if i % 3 == 0 else misty
+                ) for i in range(1, 13)
+            ])
+            db.session.commit()
+            return ash.id, misty.id
+
+    def test_lists_one_users_recipes(self):
+        ash_id, misty_id = self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+            seen = []
+            response = client.get(f'/users/{misty_id}/recipes?limit=3&user_id={ash_id}')
+            while True:
+                assert response.status_code == 200
+                assert response.headers['X-Author-Recipe-Count'] == '8'
+                data = response.get_json()
+                assert {r['user']['id'] for r in data} == {misty_id}
+                seen.extend(r['id'] for r in data)
+                cursor = response.headers.get('X-Next-Cursor')
+                if not cursor:
+                    break
+                response = client.get(f'/users/{misty_id}/recipes?limit=3&cursor={cursor}')
+            assert len(seen) == 8
+            assert seen == sorted(seen)
+
+            response = client.get('/me/recipes?fields=title')
+            assert response.headers['X-Author-Recipe-Count'] == '4'
+            assert response.get_json() == [{'title': f'Dish {i:02d}'} for i in (3, 6, 9, 12)]
+
+            response = client.get("/me/recipes?fields=title&title_prefix=Dish%2012")
+            assert response.get_json() == [{'title': 'Dish 12'}]
+            assert response.headers['X-Author-Recipe-Count'] == '4'
+            assert 'X-Total-Count' not in response.headers
+
+            assert client.get('/users/999999/recipes').status_code == 404
+            assert client.get(f'/users/{2**63 - 1}/recipes').status_code == 404
+            assert client.get(f'/users/{10**30}/recipes').status_code == 404
+            assert client.patch(f'/recipes/{10**30}', json={'title': 'Big'}).status_code == 404
+            assert client.delete(f'/recipes/{10**30}').status_code == 404
+
+    def test_401s_when_not_logged_in(self):
+        ash_id, _ = self.seed()
+
+        with app.test_client() as client:
+            assert client.get(f'/users/{ash_id}/recipes').status_code == 401
+            assert client.get('/me/recipes').status_code == 401
+
+    def test_count_follows_writes(self):
+        ash_id, misty_id = self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            client.post('/recipes/bulk', json=[{
+                'title': 'Bulk Dish',
+                'instructions': fake.paragraph(nb_sentences=8),
+                'minutes_to_complete': 5
+            }] * 3)
+
+            with app.app_context():
+                recipe = Recipe.query.filter_by(user_id=misty_id).first()
+                recipe.user_id = ash_id
+                db.session.commit()
+                Recipe.query.filter(Recipe.title == 'Dish 02').delete()
+                db.session.commit()
+                counts = {u.id: u.recipe_count for u in User.query}
+            assert counts == {ash_id: 4 + 3 + 1, misty_id: 8 - 1 - 1}
+
+    def test_uses_composite_index(self):
+        ash_id, _ = self.seed()
+
+        with app.test_request_context('/me/recipes?cursor=' + encode_cursor(3)):
+            from server.resources import recipe_listing
+            stmt, _, _ = recipe_listing(request.args, author_id=ash_id)
+            compiled = stmt.compile(compile_kwargs={"literal_binds": True})
+            plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        assert any('ix_recipes_user_id_id (user_id=? AND id>?)' in row[-1] for row in plan)
+
+
+class TestRecipeDetail:
+    def seed(self):
+        with app.app_context():
+            SessionRecord.query.delete()
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            ash = User(username="ashketchum")
+            ash.password_hash = 'pikachu'
+            misty = User(username="mistywater")
+            misty.password_hash = 'togepi'
+            db.session.add_all([ash, misty])
+            db.session.commit()
+
+            mine = Recipe(
+                title="Pallet Town Stew",
+                instructions=fake.paragraph(nb_sentences=8),
+                minutes_to_complete=30,
+                user=ash
+            )
+            theirs = Recipe(
+                title="Cerulean Chowder",
+                instructions=fake.paragraph(nb_sentences=8),
+                minutes_to_complete=45,
+                user=misty
+            )
+            db.session.add_all([mine, theirs])
+            db.session.commit()
+            return mine.id, theirs.id
+
+    def test_patches_only_supplied_fields(self):
+        mine, _ = self.seed()
+        with app.app_context():
+            before = db.session.get(Recipe, mine)
+            instructions, updated_at = before.instructions, before.updated_at
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            with count_queries() as statements:
+                response = client.patch(f'/recipes/{mine}', json={'title': 'Viridian Stew'})
+            assert response.status_code == 200
+            body = response.get_json()
+            assert body['title'] == 'Viridian Stew'
+            assert body['instructions'] == instructions
+            assert body['user']['username'] == 'ashketchum'
+            # One conditional UPDATE, then the row for the response body.
+            assert statements[0].startswith('UPDATE recipes SET title=')
+            assert 'recipes.user_id = ?' in statements[0]
+            assert len(statements) == 2
+
+            hits = client.get('/recipes/search?q=viridian').get_json()
+            assert [hit['id'] for hit in hits] == [mine]
+
+        with app.app_context():
+            assert db.session.get(Recipe, mine).updated_at > updated_at
+
+    def test_validates_patches(self):
+        mine, _ = self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            response = client.patch(f'/recipes/{mine}', json={'title': ' ', 'minutes_to_complete': 'soon'})
+            assert response.status_code == 422
+            assert response.get_json()['errors'] == [
+                'Title must be present.', 'Minutes to complete must be an integer.'
+            ]
+            response = client.patch(f'/recipes/{mine}', json={'minutes_to_complete': 10**30})
+            assert response.status_code == 422
+            assert response.get_json()['errors'] == ['Minutes to complete is too large.']
+            response = client.patch(f'/recipes/{mine}', json={'minutes_to_complete': -5})
+            assert response.status_code == 422
+            assert response.get_json()['errors'] == ["Minutes to complete can't be negative."]
+            assert client.patch(f'/recipes/{mine}', json={'user_id': 2}).status_code == 422
+            assert client.patch(f'/recipes/{mine}', json={}).status_code == 400
+
+            response = client.patch(f'/recipes/{mine}', json={'minutes_to_complete': None})
+            assert response.status_code == 200
+            assert response.get_json()['minutes_to_complete'] is None
+
+    def test_enforces_ownership(self):
+        mine, theirs = self.seed()
+
+        with app.test_client() as client:
+            assert client.patch(f'/recipes/{mine}', json={'title': 'Stolen'}).status_code == 401
+            assert client.delete(f'/recipes/{mine}').status_code == 401
+
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            assert client.patch(f'/recipes/{theirs}', json={'title': 'Stolen'}).status_code == 404
+            assert client.delete(f'/recipes/{theirs}').status_code == 404
+            assert client.delete('/recipes/999999').status_code == 404
+
+        with app.app_context():
+            assert db.session.get(Recipe, theirs).title == 'Cerulean Chowder'
+
+    def test_deletes(self):
+        mine, _ = self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            with count_queries() as statements:
+                response = client.delete(f'/recipes/{mine}')
+            assert response.status_code == 204
+            assert len(statements) == 1
+            assert client.delete(f'/recipes/{mine}').status_code == 404
+            assert client.get('/me/recipes').headers['X-Author-Recipe-Count'] == '0'
+
+    def test_sends_change_events(self):
+        mine, _ = self.seed()
+        events = []
+
+        def receiver(sender, **kwargs):
+            events.append((kwargs['action'], kwargs['recipe_id'], kwargs['user_id'], kwargs['fields']))
+
+        with app.app_context():
+            ash_id = db.session.get(Recipe, mine).user_id
+
+        with recipe_changed.connected_to(receiver, sender=app):
+            with app.test_client() as client:
+                client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+                created = client.post('/recipes', json={
+                    'title': 'Pewter Pie',
+                    'instructions': fake.paragraph(nb_sentences=8),
+                    'minutes_to_complete': 20
+                }).get_json()['id']
+                client.patch(f'/recipes/{mine}', json={'minutes_to_complete': 35})
+                client.patch(f'/recipes/{mine}', json={'title': ''})
+                client.delete(f'/recipes/{mine}')
+                client.delete(f'/recipes/{mine}')
+
+        assert events == [
+            ('created', created, ash_id, ('title', 'instructions', 'minutes_to_complete')),
+            ('updated', mine, ash_id, ('minutes_to_complete',)),
+            ('deleted', mine, ash_id, ('title', 'instructions', 'minutes_to_complete')),
+        ]
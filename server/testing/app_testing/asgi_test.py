@@ -0,0 +1,213 @@
+import asyncio
+import gzip
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("greenlet")
+
+from server.app import app, db
+from server.asgi import AsyncApp
+from server.models import User, Recipe, SessionRecord
+
+
+async def call(asgi, method, path, query="", body=None, headers=()):
+    payload = b"" if body is None else json.dumps(body).encode()
+    raw_headers = [(b"host", b"testserver")] + [(k.encode(), v.encode()) for k, v in headers]
+    if body is not None:
+        raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(payload)).encode()))
+    scope = {
+        "type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+        "path": path, "root_path": "", "query_string": query.encode(),
+        "headers": raw_headers, "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    await asgi(scope, receive, send)
+    start = messages[0]
+    response_headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    content = b"".join(m.get("body", b"") for m in messages[1:])
+    if response_headers.get("content-encoding") == "gzip":
+        content = gzip.decompress(content)
+    return start["status"], response_headers, json.loads(content) if content else None
+
+
+class TestAsyncApp:
+    '''AsyncApp in asgi.py'''
+
+    def seed(self):
+        with app.app_context():
+            SessionRecord.query.delete()
+            Recipe.query.delete()
+            User.query.delete()
+            db.session.commit()
+
+            user = User(username="ashketchum", bio="Gotta catch 'em all")
+            user.password_hash = 'pikachu'
+            db.session.add(user)
+            db.session.commit()
+            db.session.add_all([
+                Recipe(
+                    title=f"Dish {i}",
+                    instructions="Stir the pot slowly and keep stirring until it thickens. " * 2,
+                    minutes_to_complete=10 * i,
+                    user=user
+                ) for i in range(1, 6)
+            ])
+            db.session.commit()
+
+    def run(self, scenario):
+        async def main():
+            asgi = AsyncApp(app)
+            try:
+                return await scenario(asgi)
+            finally:
+                await asgi.close()
+        return asyncio.run(main())
+
+    async def login(self, asgi):
+        status, headers, _ = await call(
+            asgi, "POST", "/login", body={"username": "ashketchum", "password": "pikachu"}
+        )
+        assert status == 200
+        return ("cookie", headers["set-cookie"].split(";")[0])
+
+    def test_serves_native_routes_with_bridge_session(self):
+        '''serves /check_session and /recipes natively using a session made through Flask.'''
+        self.seed()
+
+        async def scenario(asgi):
+            status, _, body = await call(asgi, "GET", "/check_session")
+            assert status == 401
+
+            cookie = await self.login(asgi)
+            status, _, profile = await call(asgi, "GET", "/check_session", headers=[cookie])
+            assert status == 200
+            assert profile["username"] == "ashketchum"
+
+            status, headers, page = await call(asgi, "GET", "/recipes", "limit=3", headers=[cookie])
+            assert status == 200
+            assert [r["title"] for r in page] == ["Dish 1", "Dish 2", "Dish 3"]
+            assert page[0]["user"]["bio"] == "Gotta catch 'em all"
+            assert headers["link"].startswith("<http://testserver/recipes?")
+
+            status, _, page = await call(
+                asgi, "GET", "/recipes", f"cursor={headers['x-next-cursor']}&fields=title", headers=[cookie]
+            )
+            assert page == [{"title": "Dish 4"}, {"title": "Dish 5"}]
+
+            status, _, _ = await call(
+                asgi, "GET", "/recipes", "limit=3", headers=[cookie, ("if-none-match", headers["etag"])]
+            )
+            assert status == 304
+
+            status, _, body = await call(asgi, "GET", "/recipes", "limit=zero", headers=[cookie])
+            assert status == 400
+
+        self.run(scenario)
+
+    def test_matches_wsgi_responses(self):
+        '''returns the same listing as the Flask resource.'''
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            expected = client.get('/recipes?limit=2&min_minutes=20')
+
+        async def scenario(asgi):
+            cookie = await self.login(asgi)
+            return await call(asgi, "GET", "/recipes", "limit=2&min_minutes=20", headers=[cookie])
+
+        status, headers, page = self.run(scenario)
+        assert page == expected.get_json()
+        assert headers["etag"] == expected.headers["ETag"]
+        assert headers["x-next-cursor"] == expected.headers["X-Next-Cursor"]
+
+    def test_compresses_like_wsgi(self):
+        '''gzips native listings with the same headers as the Flask app.'''
+        self.seed()
+
+        with app.test_client() as client:
+            client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+            expected = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+        assert expected.headers['Content-Encoding'] == 'gzip'
+
+        async def scenario(asgi):
+            cookie = await self.login(asgi)
+            return await call(asgi, "GET", "/recipes", headers=[cookie, ("accept-encoding", "gzip")])
+
+        status, headers, page = self.run(scenario)
+        assert page == json.loads(gzip.decompress(expected.data))
+        assert headers["content-encoding"] == "gzip"
+        assert headers["vary"] == "Accept-Encoding"
+        assert headers["etag"] == expected.headers["ETag"]
+
+    def test_concurrent_requests_do_not_add_threads(self):
+        '''serves many concurrent native requests without a thread per request.'''
+        self.seed()
+
+        async def scenario(asgi):
+            cookie = await self.login(asgi)
+            before = threading.active_count()
+            results = await asyncio.gather(*[
+                call(asgi, "GET", "/recipes", headers=[cookie]) for _ in range(200)
+            ])
+            assert all(status == 200 for status, _, _ in results)
+            # aiosqlite runs one thread per pooled connection, nothing per request.
+            pool = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+            assert threading.active_count() - before <= pool["pool_size"] + pool["max_overflow"]
+
+        self.run(scenario)
+
+    def test_bridge_streams_and_reads_chunked_bodies(self, monkeypatch):
+        '''feeds a multi-message request body to Flask and streams the response back.'''
+        self.seed()
+        monkeypatch.setitem(app.config, "RECIPES_EXPORT_BATCH_SIZE", 2)
+        payload = json.dumps({"username": "ashketchum", "password": "pikachu"}).encode()
+
+        async def scenario(asgi):
+            parts = [payload[:10], payload[10:]]
+
+            async def receive():
+                body = parts.pop(0) if parts else b""
+                return {"type": "http.request", "body": body, "more_body": bool(parts)}
+
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            scope = {
+                "type": "http", "http_version": "1.1", "method": "POST", "scheme": "http",
+                "path": "/login", "root_path": "", "query_string": b"", "server": ("testserver", 80),
+                "client": ("10.0.0.1", 5000),
+                "headers": [(b"host", b"testserver"), (b"content-type", b"application/json")],
+            }
+            await asgi(scope, receive, send)
+            assert messages[0]["status"] == 200
+            cookie = dict(messages[0]["headers"])[b"set-cookie"].decode().split(";")[0]
+
+            messages.clear()
+            scope = dict(scope, method="GET", path="/recipes/export", headers=[
+                (b"host", b"testserver"), (b"cookie", cookie.encode()), (b"accept", b"application/x-ndjson"),
+            ])
+            await asgi(scope, receive, send)
+            return messages
+
+        messages = self.run(scenario)
+        assert messages[0]["status"] == 200
+        bodies = [m["body"] for m in messages[1:]]
+        assert len(bodies) > 2
+        assert bodies[-1] == b""
+        lines = b"".join(bodies).decode().splitlines()
+        assert [json.loads(line)["title"] for line in lines] == [f"Dish {i}" for i in range(1, 6)]
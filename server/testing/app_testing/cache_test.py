@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+
+import pytest
+from flask import Flask
+
+from server.cache import FakeSharedClient, LocalCache, ProfileCache, SharedCache
+
+
+class TestLocalCache:
+    '''LocalCache in cache.py'''
+
+    def test_evicts_least_recently_used(self):
+        '''evicts the least recently used entry past max_entries.'''
+        cache = LocalCache(max_entries=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('a') == 1
+        assert cache.get('b') is None
+        assert cache.get('c') == 3
+
+    def test_expires_entries(self):
+        '''expires entries after their TTL.'''
+        cache = LocalCache(ttl=0.01)
+        cache.set('a', 1)
+        time.sleep(0.02)
+        assert cache.get('a') is None
+
+
+class TestProfileCache:
+    '''ProfileCache in cache.py'''
+
+    @contextmanager
+    def make_cache(self, backend):
+        app = Flask(__name__)
+        app.extensions["profile_cache"] = backend
+        with app.app_context():
+            yield ProfileCache()
+
+    def check_versioning(self, cache):
+        payload, key = cache.lookup(1)
+        assert payload is None
+        cache.store(key, {'id': 1, 'username': 'ash'})
+        assert cache.lookup(1)[0] == {'id': 1, 'username': 'ash'}
+
+        cache.invalidate(1)
+        assert cache.lookup(1)[0] is None
+
+        payload, key = cache.lookup(1)
+        cache.store(key, {'id': 1, 'username': 'ashketchum'})
+        cache.invalidate_all()
+        assert cache.lookup(1)[0] is None
+
+    def test_local_backend(self):
+        '''invalidates entries by version on the local backend.'''
+        with self.make_cache(LocalCache()) as cache:
+            self.check_versioning(cache)
+
+    def test_shared_backend(self):
+        '''invalidates entries by version on the shared backend.'''
+        with self.make_cache(SharedCache(FakeSharedClient(), ttl=60)) as cache:
+            self.check_versioning(cache)
+
+    def test_shared_backend_needs_client(self):
+        '''refuses a shared backend without a client rather than caching per process.'''
+        app = Flask(__name__)
+        app.config["PROFILE_CACHE_BACKEND"] = "shared"
+        with pytest.raises(RuntimeError):
+            ProfileCache().init_app(app)
+
+    def test_racing_reader_cannot_restore_stale_entry(self):
+        '''ignores payloads stored under a version that was invalidated.'''
+        with self.make_cache(LocalCache()) as cache:
+            _, key = cache.lookup(1)
+            cache.invalidate(1)
+            cache.store(key, {'id': 1, 'username': 'stale'})
+            assert cache.lookup(1)[0] is None
+
+    def test_apps_keep_separate_caches(self, make_app):
+        '''serves each app its own cached profiles.'''
+        first, second = make_app(), make_app()
+        for app, username in ((first, 'alice'), (second, 'bob')):
+            with app.test_client() as client:
+                client.post('/signup', json={'username': username, 'password': 'pikachu'})
+        for app, username in ((first, 'alice'), (second, 'bob')):
+            with app.test_client() as client:
+                client.post('/login', json={'username': username, 'password': 'pikachu'})
+                assert client.get('/check_session').get_json()['username'] == username
+                assert client.get('/check_session').get_json()['username'] == username
@@ -0,0 +1,95 @@
+import gzip
+import json
+import zlib
+
+import pytest
+
+import server.compression
+from server.app import db
+from server.compression import negotiate
+from server.models import Recipe
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(COMPRESSION_MIN_SIZE=512)
+
+
+@pytest.fixture
+def long_instructions(instructions):
+    return instructions * 4
+
+
+@pytest.fixture
+def recipes(app, trainers, long_instructions):
+    with app.app_context():
+        db.session.add_all([
+            Recipe(title=f"Dish {i}", instructions=long_instructions, minutes_to_complete=i, user_id=trainers[0])
+            for i in range(20)
+        ])
+        db.session.commit()
+
+
+@pytest.mark.usefixtures("recipes")
+class TestCompression:
+    '''response compression in compression.py'''
+
+    def test_negotiates_encoding(self):
+        '''prefers gzip, falls back to deflate and honours q=0.'''
+        assert negotiate('gzip, deflate, br') == 'gzip'
+        assert negotiate('deflate;q=1, gzip;q=0.5') == 'deflate'
+        assert negotiate('gzip;q=0, deflate') == 'deflate'
+        assert negotiate('br') is None
+        assert negotiate(None) is None
+
+    def test_compresses_large_json(self, client):
+        '''gzips a large listing, weakens its ETag and still answers If-None-Match.'''
+        plain = client.get('/recipes')
+        assert 'Content-Encoding' not in plain.headers
+        assert plain.headers['Vary'] == 'Accept-Encoding'
+
+        response = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['Vary'] == 'Accept-Encoding'
+        assert int(response.headers['Content-Length']) < len(plain.data) / 4
+        assert json.loads(gzip.decompress(response.data)) == plain.get_json()
+        assert response.headers['ETag'] == 'W/' + plain.headers['ETag']
+
+        again = client.get('/recipes', headers={
+            'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']
+        })
+        assert again.status_code == 304
+
+        response = client.get('/recipes', headers={'Accept-Encoding': 'deflate'})
+        assert response.headers['Content-Encoding'] == 'deflate'
+        assert json.loads(zlib.decompress(response.data)) == plain.get_json()
+
+    def test_skips_small_bodies(self, client):
+        '''leaves bodies under COMPRESSION_MIN_SIZE alone.'''
+        response = client.get('/recipes?limit=1', headers={'Accept-Encoding': 'gzip'})
+        assert response.status_code == 200
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_json()[0]['title'] == 'Dish 0'
+
+    def test_caches_by_etag(self, client, long_instructions, monkeypatch):
+        '''compresses a listing once per ETag and again after a write.'''
+        calls = []
+        encode = server.compression.encode
+        monkeypatch.setattr(server.compression, 'encode', lambda *a: calls.append(a[1]) or encode(*a))
+
+        first = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+        second = client.get('/recipes', headers={'Accept-Encoding': 'gzip'})
+        assert first.data == second.data
+        assert calls == ['gzip']
+
+        # No ETag on the per-user listing, so nothing is cached for it.
+        client.get('/me/recipes', headers={'Accept-Encoding': 'gzip'})
+        client.get('/me/recipes', headers={'Accept-Encoding': 'gzip'})
+        assert calls == ['gzip'] * 3
+
+        client.post('/recipes', json={
+            'title': 'Pallet Town Stew', 'instructions': long_instructions, 'minutes_to_complete': 30
+        })
+        third = client.get('/recipes?limit=100', headers={'Accept-Encoding': 'gzip'})
+        assert json.loads(gzip.decompress(third.data))[-1]['title'] == 'Pallet Town Stew'
+        assert len(calls) == 4
@@ -0,0 +1,29 @@
+from sqlalchemy import text
+
+from server.app import app, db
+from server.config import Config
+
+
+class TestSqlitePragmas:
+    '''install_sqlite_pragmas in database.py'''
+
+    def test_applies_configured_pragmas(self):
+        '''applies the configured PRAGMAs to every pooled connection.'''
+        with app.app_context():
+            with db.engine.connect() as conn:
+                assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+                assert conn.execute(text("PRAGMA busy_timeout")).scalar() == Config.SQLITE_PRAGMAS["busy_timeout"]
+                assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+    def test_uses_configured_pool(self):
+        '''builds the engine with the configured pool options.'''
+        with app.app_context():
+            assert db.engine.pool.size() == Config.SQLALCHEMY_ENGINE_OPTIONS["pool_size"]
+
+    def test_in_memory_database_drops_queue_pool_options(self, make_app):
+        '''starts on in-memory SQLite, whose StaticPool takes no pool sizing.'''
+        for uri in ("sqlite://", "sqlite:///:memory:"):
+            memory_app = make_app(SQLALCHEMY_DATABASE_URI=uri)
+            with memory_app.app_context():
+                assert db.session.execute(text("SELECT count(*) FROM users")).scalar() == 0
+                assert "pool_size" not in memory_app.config["SQLALCHEMY_ENGINE_OPTIONS"]
@@ -0,0 +1,123 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from server.app import db, group_commit
+from server.models import User, Recipe
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(GROUP_COMMIT_ENABLED=True, GROUP_COMMIT_WINDOW_MS=50)
+
+
+@pytest.fixture
+def commits(app):
+    commits = []
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, "commit", commits.append)
+    return commits
+
+
+class TestGroupCommit:
+    '''GroupCommit in groupcommit.py'''
+
+    def test_isolates_failures_in_a_batch(self, app, commits):
+        '''commits a batch once and fails only the job that raised.'''
+        def add_user(username):
+            def job(session):
+                user = User(username=username, _password_hash="unused")
+                session.add(user)
+                session.flush()
+                return user.id
+            return job
+
+        writer = group_commit._writer(app)
+        futures = [writer.submit(add_user(name)) for name in ('ash', 'misty', 'ash', 'brock')]
+
+        assert [f.result(timeout=5) for f in futures[:2]] == [1, 2]
+        assert isinstance(futures[2].exception(timeout=5), IntegrityError)
+        assert futures[3].result(timeout=5) == 3
+        assert len(commits) == 1
+        with app.app_context():
+            assert [u.username for u in User.query.order_by(User.id)] == ['ash', 'misty', 'brock']
+
+    def test_coalesces_concurrent_requests(self, app, commits, instructions):
+        '''answers each concurrent poster with its own recipe from a handful of commits.'''
+        client = app.test_client()
+        client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+        posters = []
+        for _ in range(20):
+            poster = app.test_client()
+            with poster.session_transaction() as session:
+                session['user_id'] = 1
+            posters.append(poster)
+        responses = [None] * len(posters)
+        barrier = threading.Barrier(len(posters))
+        del commits[:]
+
+        def post(index):
+            barrier.wait()
+            responses[index] = posters[index].post('/recipes', json={
+                'title': f'Dish {index}' if index != 7 else '',
+                'instructions': instructions,
+                'minutes_to_complete': index,
+            })
+
+        threads = [threading.Thread(target=post, args=(i,)) for i in range(len(responses))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert responses[7].status_code == 422
+        created = [r.get_json() for i, r in enumerate(responses) if i != 7]
+        assert all(r.status_code == 201 for i, r in enumerate(responses) if i != 7)
+        assert len({body['id'] for body in created}) == 19
+        assert all(body['user']['username'] == 'ashketchum' for body in created)
+        # One batch normally; the window may split a slow start in two.
+        assert len(commits) <= 2
+        with app.app_context():
+            assert Recipe.query.count() == 19
+            assert db.session.get(User, 1).recipe_count == 19
+
+    def test_signup_through_writer(self, app):
+        '''creates the user and logs them in from the writer's result.'''
+        with app.test_client() as client:
+            response = client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+            assert response.status_code == 201
+            assert client.get('/check_session').get_json()['id'] == response.get_json()['id']
+
+            duplicate = client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+            assert duplicate.status_code == 422
+
+    def test_503s_when_database_is_locked(self, make_app, instructions):
+        '''answers 503, not 422, when the write transaction itself can't start.'''
+        for enabled in (True, False):
+            app = make_app(
+                GROUP_COMMIT_ENABLED=enabled,
+                SQLITE_PRAGMAS={"journal_mode": "WAL", "busy_timeout": 50},
+            )
+            client = app.test_client()
+            client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+
+            path = app.config["SQLALCHEMY_DATABASE_URI"].removeprefix("sqlite:///")
+            holder = sqlite3.connect(path, isolation_level=None)
+            holder.execute("BEGIN IMMEDIATE")
+            try:
+                response = client.post('/recipes', json={
+                    'title': 'Locked Stew', 'instructions': instructions, 'minutes_to_complete': 5
+                })
+            finally:
+                holder.rollback()
+                holder.close()
+
+            assert response.status_code == 503, enabled
+            assert response.headers['Retry-After']
+            with app.app_context():
+                assert Recipe.query.count() == 0
@@ -0,0 +1,68 @@
+import logging
+
+import pytest
+
+from server import gunicorn_conf
+from server.app import app, db
+from server.config import hash_pool_workers
+
+
+class FakeWorker:
+    pid = 1234
+    alive = True
+    log = logging.getLogger("gunicorn.test")
+
+
+class TestGunicornConf:
+    '''hooks in gunicorn_conf.py'''
+
+    def test_recycles_worker_over_rss_limit(self, monkeypatch):
+        '''stops a worker gracefully once its RSS passes the limit.'''
+        worker = FakeWorker()
+        monkeypatch.setattr(gunicorn_conf, "max_worker_rss_mb", 64)
+
+        monkeypatch.setattr(gunicorn_conf, "rss_mb", lambda: 32)
+        gunicorn_conf.post_request(worker, None, {}, None)
+        assert worker.alive
+
+        monkeypatch.setattr(gunicorn_conf, "rss_mb", lambda: 128)
+        gunicorn_conf.post_request(worker, None, {}, None)
+        assert not worker.alive
+
+    def test_reports_rss(self):
+        '''reads a plausible RSS for the current process.'''
+        assert 1 < gunicorn_conf.rss_mb() < 4096
+
+    def test_post_fork_replaces_inherited_pool(self):
+        '''gives a forked worker a fresh connection pool.'''
+        with app.app_context():
+            db.session.execute(db.select(1))
+            db.session.remove()
+            inherited = db.engine.pool
+
+            gunicorn_conf.post_fork(None, FakeWorker())
+            assert db.engine.pool is not inherited
+            assert db.engine.pool.checkedin() == 0
+
+    def test_bcrypt_processes_match_cores(self, monkeypatch):
+        '''sizes each worker's bcrypt pool so the server runs about one per core.'''
+        monkeypatch.setattr("os.cpu_count", lambda: 8)
+        monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+        assert 8 * hash_pool_workers() == 8
+
+        monkeypatch.setenv("WEB_CONCURRENCY", "2")
+        assert 2 * hash_pool_workers() == 8
+
+    def test_refuses_per_process_rate_limits(self, monkeypatch):
+        '''fails at startup when several workers would each keep their own rate-limit counters.'''
+        monkeypatch.setitem(app.config, "RATE_LIMIT_ENABLED", True)
+        monkeypatch.setitem(app.config, "RATE_LIMIT_BACKEND", "memory")
+        monkeypatch.setattr(gunicorn_conf, "workers", 4)
+        with pytest.raises(RuntimeError, match="4 workers"):
+            gunicorn_conf.when_ready(None)
+
+        monkeypatch.setattr(gunicorn_conf, "workers", 1)
+        gunicorn_conf.check_shared_state(app)
+        monkeypatch.setattr(gunicorn_conf, "workers", 4)
+        monkeypatch.setitem(app.config, "RATE_LIMIT_BACKEND", "shared")
+        gunicorn_conf.check_shared_state(app)
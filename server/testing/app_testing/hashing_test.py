@@ -0,0 +1,76 @@
+import pytest
+
+from server.app import hash_pool
+from server.hashing import HashingUnavailable, hash_cost
+from server.models import User
+
+
+@pytest.fixture
+def app(make_app):
+    # TestingConfig hashes inline; these tests are about the pool.
+    return make_app(HASH_POOL_WORKERS=2)
+
+
+@pytest.fixture
+def config(app):
+    return app.config
+
+
+class TestHashPool:
+    '''HashPool in hashing.py'''
+
+    def test_hashes_in_worker_pool(self, app):
+        '''hashes and verifies passwords in the worker pool.'''
+        with app.app_context():
+            hashed = hash_pool.generate_password_hash("pikachu")
+            assert hash_cost(hashed) == 4
+            assert hash_pool.check_password_hash(hashed, "pikachu")
+            assert not hash_pool.check_password_hash(hashed, "raichu")
+
+    def test_503s_when_pool_is_full(self, app, config):
+        '''fails fast with a 503 once the queue is full.'''
+        config["HASH_POOL_QUEUE_DEPTH"] = 0
+
+        with app.test_client() as client:
+            with app.app_context():
+                hash_pool._ensure_pool(app.config)
+            for _ in range(config["HASH_POOL_WORKERS"]):
+                assert hash_pool._slots.acquire(blocking=False)
+            try:
+                response = client.post('/signup', json={
+                    'username': 'ashketchum',
+                    'password': 'pikachu',
+                })
+            finally:
+                for _ in range(config["HASH_POOL_WORKERS"]):
+                    hash_pool._slots.release()
+
+            assert response.status_code == 503
+            assert response.headers['Retry-After']
+
+    def test_timed_out_work_keeps_its_slot(self, app, config):
+        '''holds a timed-out hash's slot until the worker finishes it.'''
+        config["BCRYPT_LOG_ROUNDS"] = 13
+        config["HASH_POOL_WORKERS"] = 1
+        config["HASH_POOL_QUEUE_DEPTH"] = 0
+        config["HASH_POOL_TIMEOUT"] = 0.01
+        with app.app_context():
+            with pytest.raises(HashingUnavailable, match="timed out"):
+                hash_pool.generate_password_hash("pikachu")
+            with pytest.raises(HashingUnavailable, match="capacity"):
+                hash_pool.generate_password_hash("pikachu")
+
+    def test_rehashes_on_login(self, app, config, trainers):
+        '''rehashes the stored password when the configured cost changes.'''
+        config["BCRYPT_LOG_ROUNDS"] = 5
+        with app.test_client() as client:
+            response = client.post('/login', json={
+                'username': 'ashketchum',
+                'password': 'pikachu',
+            })
+            assert response.status_code == 200
+
+        with app.app_context():
+            user = User.query.filter_by(username="ashketchum").first()
+            assert hash_cost(user._password_hash) == 5
+            assert user.authenticate('pikachu')
@@ -0,0 +1,26 @@
+class TestMetrics:
+    '''Metrics in instrumentation.py'''
+
+    def test_records_timings(self, make_app):
+        '''adds Server-Timing headers and exposes Prometheus metrics.'''
+        # Hashing inline still records the bcrypt phase.
+        with make_app(METRICS_ENABLED=True).test_client() as client:
+            response = client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+            assert response.status_code == 201
+            timing = response.headers['Server-Timing']
+            assert 'bcrypt;dur=' in timing
+            assert 'db;dur=' in timing
+            assert 'serialize;dur=' in timing
+            assert 'total;dur=' in timing
+
+            body = client.get('/metrics').get_data(as_text=True)
+            assert 'http_request_duration_seconds_count{endpoint="signup"} 1' in body
+            assert 'app_phase_calls_total{endpoint="signup",phase="bcrypt"} 1' in body
+            assert 'app_phase_calls_total{endpoint="signup",phase="db"}' in body
+
+    def test_disabled_by_default(self, app):
+        '''installs nothing when METRICS_ENABLED is off.'''
+        with app.test_client() as client:
+            response = client.get('/check_session')
+            assert 'Server-Timing' not in response.headers
+            assert client.get('/metrics').status_code == 404
@@ -0,0 +1,112 @@
+import pytest
+from flask import Flask
+from sqlalchemy import event
+
+from server.app import db, hash_pool
+from server.cache import FakeSharedClient
+from server.ratelimit import MemoryRateLimitStore, RateLimiter, SharedRateLimitStore, sliding_count
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app(RATE_LIMIT_ENABLED=True, RATE_LIMITS={"login_ip": 10, "login_user": 2, "signup_ip": 2})
+
+
+class TestRateLimitStores:
+    '''MemoryRateLimitStore and SharedRateLimitStore in ratelimit.py'''
+
+    def check_sliding_window(self, store):
+        assert store.hit('k', 10) == (0, 1)
+        assert store.hit('k', 10) == (0, 2)
+        # The next window carries the last one over as "previous".
+        assert store.hit('k', 11) == (2, 1)
+        assert sliding_count(2, 1, 0.25) == 2.5
+        # A gap of more than one window forgets everything.
+        assert store.hit('k', 13) == (0, 1)
+
+    def test_memory_sliding_window(self):
+        '''weights the previous window into the current count.'''
+        self.check_sliding_window(MemoryRateLimitStore())
+
+    def test_shared_sliding_window(self):
+        '''keeps the same counts in a Redis-style client.'''
+        self.check_sliding_window(SharedRateLimitStore(FakeSharedClient(), window=60))
+
+    def test_memory_bounded(self):
+        '''keeps at most max_keys keys.'''
+        store = MemoryRateLimitStore(max_keys=100)
+        for i in range(10000):
+            store.hit(f'ip:{i}', 1)
+        assert len(store._entries) == 100
+
+    def test_shared_needs_client(self):
+        '''refuses a shared backend without a client rather than counting per process.'''
+        app = Flask(__name__)
+        app.config["RATE_LIMIT_BACKEND"] = "shared"
+        with pytest.raises(RuntimeError):
+            RateLimiter().init_app(app)
+
+        app.config["RATE_LIMIT_CLIENT"] = FakeSharedClient()
+        RateLimiter().init_app(app)
+        assert isinstance(app.extensions["rate_limiter"], SharedRateLimitStore)
+
+
+class TestRateLimitedResources:
+    '''rate limits on Login and Signup in resources.py'''
+
+    def test_limits_signups_per_ip(self, app):
+        '''429s signups past the per-IP limit.'''
+        with app.test_client() as client:
+            for i in range(2):
+                response = client.post('/signup', json={'username': f'trainer{i}', 'password': 'pikachu'})
+                assert response.status_code == 201
+            response = client.post('/signup', json={'username': 'trainer9', 'password': 'pikachu'})
+            assert response.status_code == 429
+            assert int(response.headers['Retry-After']) >= 1
+
+    def test_limits_forwarded_client_ip(self, make_app):
+        '''counts each client behind a trusted proxy by its forwarded address, ignoring spoofed hops.'''
+        app = make_app(RATE_LIMIT_ENABLED=True, RATE_LIMITS={"signup_ip": 1}, PROXY_FIX_X_FOR=1)
+
+        def signup(username, forwarded_for):
+            return app.test_client().post(
+                '/signup', json={'username': username, 'password': 'pikachu'},
+                headers={'X-Forwarded-For': forwarded_for}
+            ).status_code
+
+        assert signup('trainer1', '203.0.113.1') == 201
+        assert signup('trainer2', '203.0.113.2') == 201
+        # The client may prepend anything; only the proxy's own entry counts.
+        assert signup('trainer3', '198.51.100.9, 203.0.113.1') == 429
+
+    def test_rejects_logins_before_db_or_bcrypt(self, app, monkeypatch):
+        '''429s logins past the per-user limit without touching the database or bcrypt.'''
+        with app.test_client() as client:
+            client.post('/signup', json={'username': 'ashketchum', 'password': 'pikachu'})
+            for _ in range(2):
+                response = client.post('/login', json={'username': 'ashketchum', 'password': 'wrong'})
+                assert response.status_code == 401
+
+            def no_bcrypt(*args):
+                raise AssertionError("bcrypt ran for a rate-limited request")
+            monkeypatch.setattr(hash_pool, '_run', no_bcrypt)
+
+            statements = []
+            with app.app_context():
+                engine = db.engine
+            record = lambda conn, cursor, statement, *args: statements.append(statement)
+            event.listen(engine, "before_cursor_execute", record)
+            try:
+                # A fresh client carries no session cookie to look up.
+                response = app.test_client().post(
+                    '/login', json={'username': 'ashketchum', 'password': 'pikachu'}
+                )
+            finally:
+                event.remove(engine, "before_cursor_execute", record)
+            assert response.status_code == 429
+            assert statements == []
+
+            # Other usernames from the same address are still under the IP limit.
+            monkeypatch.undo()
+            response = client.post('/login', json={'username': 'mistywater', 'password': 'togepi'})
+            assert response.status_code == 401
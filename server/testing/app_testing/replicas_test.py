@@ -0,0 +1,80 @@
+import time
+
+import pytest
+
+from server.app import db, replicas
+from server.models import Recipe, User
+
+
+@pytest.fixture
+def app(make_app, tmp_path):
+    app = make_app(
+        SQLALCHEMY_REPLICA_URIS=[f"sqlite:///{tmp_path / 'replica.db'}"],
+        REPLICA_STICKY_SECONDS=0.5,
+    )
+    replicas.sync(app)
+    return app
+
+
+class TestReplicas:
+    '''read replica routing in replicas.py'''
+
+    def signup(self, app, username):
+        client = app.test_client()
+        response = client.post('/signup', json={'username': username, 'password': 'pikachu'})
+        assert response.status_code == 201
+        return client
+
+    def titles(self, client):
+        response = client.get('/recipes')
+        assert response.status_code == 200
+        return [r['title'] for r in response.get_json()]
+
+    def test_reads_own_writes_then_replica(self, app, instructions):
+        '''serves a writer from the primary during the sticky window, then from the replica.'''
+        ash = self.signup(app, 'ashketchum')
+        misty = self.signup(app, 'mistywater')
+        replicas.sync(app)
+        time.sleep(0.5)
+
+        response = ash.post('/recipes', json={
+            'title': 'Pallet Town Stew', 'instructions': instructions, 'minutes_to_complete': 30
+        })
+        assert response.status_code == 201
+
+        # The writer reads the primary; everyone else sees the lagging replica.
+        assert self.titles(ash) == ['Pallet Town Stew']
+        assert self.titles(misty) == []
+
+        time.sleep(0.5)
+        assert self.titles(ash) == []
+
+        replicas.sync(app)
+        assert self.titles(ash) == ['Pallet Town Stew']
+        assert self.titles(misty) == ['Pallet Town Stew']
+
+    def test_replica_reads_do_not_fill_profile_cache(self, app):
+        '''never caches a profile read from a lagging replica.'''
+        ash = self.signup(app, 'ashketchum')
+        replicas.sync(app)
+        time.sleep(0.5)
+
+        with app.app_context():
+            User.query.filter_by(username='ashketchum').first().bio = 'Pokemon master'
+            db.session.commit()
+
+        assert ash.get('/check_session').get_json()['bio'] == ''
+        replicas.sync(app)
+        assert ash.get('/check_session').get_json()['bio'] == 'Pokemon master'
+
+    def test_writes_go_to_primary(self, app):
+        '''writes to the primary only; replicas change only when synced.'''
+        self.signup(app, 'ashketchum')
+
+        with app.app_context():
+            assert Recipe.query.count() == 0
+            with db.engine.connect() as conn:
+                users = conn.exec_driver_sql("SELECT count(*) FROM users").scalar()
+            with replicas.engines(app)[0].connect() as conn:
+                replica_users = conn.exec_driver_sql("SELECT count(*) FROM users").scalar()
+        assert (users, replica_users) == (1, 0)
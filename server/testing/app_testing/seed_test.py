@@ -0,0 +1,36 @@
+from server.app import app
+from server.models import User, Recipe
+
+
+class TestSeedBulk:
+    '''seed-bulk command in seed.py'''
+
+    def run(self, *args):
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=[
+            'seed-bulk', '--users', '5', '--recipes', '30', '--chunk-size', '7',
+            '--password-pool', '2', '--clear', *args
+        ])
+        assert result.exit_code == 0, result.output
+        with app.app_context():
+            return [
+                (r.title, r.minutes_to_complete, r.user_id)
+                for r in Recipe.query.order_by(Recipe.id)
+            ]
+
+    def test_generates_users_and_recipes(self):
+        '''inserts the requested users and recipes.'''
+        recipes = self.run('--seed', '3')
+        assert len(recipes) == 30
+        with app.app_context():
+            assert User.query.count() == 5
+            assert User.query.first().authenticate('password0')
+
+    def test_is_deterministic(self):
+        '''produces the same rows for the same seed.'''
+        assert self.run('--seed', '3') == self.run('--seed', '3')
+        assert self.run('--seed', '3') != self.run('--seed', '4')
+
+    def test_workers_only_generate_rows(self):
+        '''inserts the same rows with several generating workers as with one.'''
+        assert self.run('--seed', '3', '--workers', '3') == self.run('--seed', '3')
@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import event, insert, text
+
+from server.app import db
+from server.models import User, Recipe
+
+
+@pytest.fixture
+def stews(app, trainers, instructions):
+    '''Adds one recipe per trainer: Orm Stew through the ORM, Core Stew through Core.'''
+    ash_id, misty_id = trainers
+    with app.app_context():
+        db.session.add(Recipe(title="Orm Stew", instructions=instructions, user_id=ash_id))
+        db.session.execute(insert(Recipe), [
+            {"title": "Core Stew", "instructions": instructions, "user_id": misty_id}
+        ])
+        db.session.commit()
+    return trainers
+
+
+def snapshots(app):
+    with app.app_context():
+        return {
+            r.title: (r.author_username, r.author_image_url, r.author_bio)
+            for r in Recipe.query.order_by(Recipe.id)
+        }
+
+
+class TestAuthorSnapshots:
+    '''recipe author snapshots in models.py'''
+
+    def test_follows_inserts_and_profile_edits(self, app, stews, client, instructions):
+        '''fills snapshots on insert and rewrites them on profile edits and reassignment.'''
+        ash_id, misty_id = stews
+        assert snapshots(app) == {
+            "Orm Stew": ("ashketchum", "ash.png", "Pallet Town"),
+            "Core Stew": ("mistywater", "misty.png", "Cerulean Gym"),
+        }
+
+        client.post('/recipes/bulk', json=[{'title': 'Bulk Stew', 'instructions': instructions}])
+
+        with app.app_context():
+            db.session.get(User, ash_id).bio = "Champion"
+            db.session.commit()
+            User.query.filter_by(id=misty_id).update({"image_url": "misty2.png"})
+            db.session.commit()
+            Recipe.query.filter_by(title="Bulk Stew").update({"user_id": misty_id})
+            db.session.commit()
+
+        assert snapshots(app) == {
+            "Orm Stew": ("ashketchum", "ash.png", "Champion"),
+            "Core Stew": ("mistywater", "misty2.png", "Cerulean Gym"),
+            "Bulk Stew": ("mistywater", "misty2.png", "Cerulean Gym"),
+        }
+
+    def test_listing_reads_snapshots_without_join(self, app, stews, client):
+        '''serves the same listing from snapshot columns with no join.'''
+        joined = client.get('/recipes').get_json()
+
+        app.config["RECIPE_AUTHOR_SNAPSHOT"] = True
+        statements = []
+        record = lambda conn, cursor, statement, *args: statements.append(statement)
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            response = client.get('/recipes')
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert response.get_json() == joined
+        listing = [s for s in statements if "FROM recipes" in s]
+        assert len(listing) == 1
+        assert "JOIN" not in listing[0]
+
+    def test_repairs_stale_snapshots(self, app, stews):
+        '''rewrites only missing or stale snapshots, in batches.'''
+        with app.app_context():
+            db.session.execute(text(
+                "UPDATE recipes SET author_username = NULL, author_bio = 'stale' WHERE title = 'Core Stew'"
+            ))
+            db.session.commit()
+
+        runner = app.test_cli_runner()
+        result = runner.invoke(args=['repair-author-snapshots', '--batch-size', '1'])
+        assert result.exit_code == 0, result.output
+        assert result.output.splitlines()[-1].startswith('1 snapshots rewritten')
+        assert snapshots(app)["Core Stew"] == ("mistywater", "misty.png", "Cerulean Gym")
+
+        result = runner.invoke(args=['repair-author-snapshots'])
+        assert result.output.splitlines()[-1].startswith('0 snapshots rewritten')
@@ -0,0 +1,12 @@
+from server.benchmarks.startup import measure
+
+
+class TestColdStart:
+    '''cold start in benchmarks/startup.py'''
+
+    def test_defers_heavy_imports(self):
+        '''starts and serves a first request without loading deferred modules.'''
+        # Timings are machine-dependent; the budget lives in the benchmark CLI.
+        results = measure(runs=1)
+        assert results["status"] == 401
+        assert results["deferred_loaded"] == []
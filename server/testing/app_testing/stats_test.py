@@ -0,0 +1,129 @@
+import random
+from statistics import quantiles
+
+import pytest
+from sqlalchemy import event, insert, text
+
+from server.app import db
+from server.models import User, Recipe
+from server.stats import percentiles
+
+
+@pytest.fixture
+def add_recipes(app, trainers, instructions):
+    '''Inserts recipes with the given minutes, two in three for ashketchum.'''
+    ash_id, misty_id = trainers
+
+    def add(minutes):
+        with app.app_context():
+            db.session.execute(insert(Recipe), [
+                {"title": f"Dish {i}", "instructions": instructions, "minutes_to_complete": m,
+                 "user_id": ash_id if i % 3 else misty_id}
+                for i, m in enumerate(minutes)
+            ])
+            db.session.commit()
+    return add
+
+
+def get_stats(client, query=''):
+    response = client.get('/stats' + query)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+class TestPercentiles:
+    '''percentile estimates in stats.py'''
+
+    def test_walks_buckets(self):
+        '''picks the bucket holding each rank, exactly below an hour.'''
+        buckets = [(10, 50), (20, 40), (60, 9), (1440, 1)]
+        assert percentiles(buckets, 100) == {'p50': 10, 'p90': 20, 'p99': 62}
+        assert percentiles([], 0) == {'p50': None, 'p90': None, 'p99': None}
+
+
+class TestStats:
+    '''/stats and its summary tables'''
+
+    def test_requires_login(self, app, client):
+        '''401s without a session and 400s a bad days parameter.'''
+        assert app.test_client().get('/stats').status_code == 401
+        assert client.get('/stats?days=0').status_code == 400
+        assert client.get('/stats?days=week').status_code == 400
+
+    def test_summarizes_without_scanning(self, app, trainers, client, add_recipes):
+        '''answers from summary tables and indexes only.'''
+        ash_id, misty_id = trainers
+        add_recipes([5, 30, None, 90, 45, 120])
+
+        statements = []
+        record = lambda conn, cursor, statement, parameters, *args: statements.append((statement, parameters))
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            stats = get_stats(client)
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+
+        assert stats['users'] == 2
+        assert stats['recipes'] == 6
+        minutes = stats['minutes_to_complete']
+        assert minutes == {
+            'count': 5, 'average': 58.0, 'min': 5, 'max': 120, 'p50': 45, 'p90': 122, 'p99': 122
+        }
+        assert [(d['count']) for d in stats['signups_per_day']] == [2]
+        assert stats['top_authors'] == [
+            {'id': ash_id, 'username': 'ashketchum', 'recipe_count': 4},
+            {'id': misty_id, 'username': 'mistywater', 'recipe_count': 2},
+        ]
+
+        with app.app_context():
+            connection = db.session.connection()
+            for statement, parameters in statements:
+                plan = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+                details = [row[-1] for row in plan]
+                assert 'SCAN recipes' not in details, statement
+                assert 'SCAN users' not in details, statement
+
+    def test_incremental_matches_rebuild(self, app, trainers, client, add_recipes, instructions):
+        '''matches a full rebuild after inserts, edits and deletes, and the rebuild repairs drift.'''
+        ash_id, misty_id = trainers
+        add_recipes([5, 30, None, 90])
+
+        app.test_client().post('/signup', json={'username': 'brock', 'password': 'onix'})
+        client.post('/recipes', json={
+            'title': 'Pewter Pie', 'instructions': instructions, 'minutes_to_complete': 400
+        })
+        with app.app_context():
+            first = Recipe.query.filter_by(user_id=ash_id).order_by(Recipe.id).first().id
+        client.patch(f'/recipes/{first}', json={'minutes_to_complete': 2000})
+        client.delete(f'/recipes/{first + 1}')
+        with app.app_context():
+            db.session.delete(db.session.get(User, misty_id))
+            db.session.commit()
+
+        incremental = get_stats(client)
+        with app.app_context():
+            db.session.execute(text("UPDATE stat_counters SET value = value + 7"))
+            db.session.execute(text("DELETE FROM recipe_minutes_buckets"))
+            db.session.execute(text("UPDATE users SET recipe_count = 0"))
+            db.session.commit()
+        result = app.test_cli_runner().invoke(args=['rebuild-stats'])
+        assert result.exit_code == 0, result.output
+        rebuilt = get_stats(client)
+
+        assert incremental == rebuilt
+        assert incremental['users'] == 2
+        assert incremental['recipes'] == 2
+        assert incremental['minutes_to_complete']['max'] == 2000
+
+    def test_percentiles_are_close(self, client, add_recipes):
+        '''estimates percentiles within half a bucket of the exact values.'''
+        rng = random.Random(7)
+        minutes = [int(rng.lognormvariate(4, 1)) for _ in range(2000)]
+        add_recipes(minutes)
+
+        estimate = get_stats(client)['minutes_to_complete']
+        exact = quantiles(minutes, n=100, method='inclusive')
+        for p in (50, 90, 99):
+            assert abs(estimate[f'p{p}'] - exact[p - 1]) <= max(1, 0.08 * exact[p - 1]), p
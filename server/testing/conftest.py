@@ -1,4 +1,10 @@
 #!/usr/bin/env python3
+import pytest
+
+from server.config import TestingConfig
+
+INSTRUCTIONS = "Stir the pot slowly and keep stirring until it thickens nicely."
+
 
 def pytest_itemcollected(item):
     par = item.parent.obj
@@ -7,3 +13,65 @@ def pytest_itemcollected(item):
     suf = node.__doc__.strip() if node.__doc__ else node.__name__
     if pref or suf:
         item._nodeid = ' '.join((pref, suf))
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    '''Builds apps on TestingConfig, each with its own database file and
+    any config overrides passed as keyword arguments.'''
+    from server.app import create_app, db, group_commit, hash_pool, replicas
+
+    apps = []
+
+    def make(**overrides):
+        overrides.setdefault("SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / f'app{len(apps)}.db'}")
+        app = create_app(type("AppTestConfig", (TestingConfig,), overrides))
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        return app
+
+    yield make
+
+    for app in apps:
+        group_commit.shutdown(app)
+        replicas.dispose(app)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+    hash_pool.shutdown()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def instructions():
+    return INSTRUCTIONS
+
+
+@pytest.fixture
+def trainers(app):
+    '''Seeds ashketchum (password pikachu) and mistywater (togepi); returns their ids.'''
+    from server.app import db
+    from server.models import User
+
+    with app.app_context():
+        ash = User(username="ashketchum", image_url="ash.png", bio="Pallet Town")
+        ash.password_hash = 'pikachu'
+        misty = User(username="mistywater", image_url="misty.png", bio="Cerulean Gym")
+        misty.password_hash = 'togepi'
+        db.session.add_all([ash, misty])
+        db.session.commit()
+        return ash.id, misty.id
+
+
+@pytest.fixture
+def client(app, trainers):
+    '''A test client logged in as ashketchum.'''
+    client = app.test_client()
+    response = client.post('/login', json={'username': 'ashketchum', 'password': 'pikachu'})
+    assert response.status_code == 200
+    return client